@@ -0,0 +1,44 @@
+"""Background archival of closed tickets.
+
+With ARCHIVE_AFTER_DAYS set, tickets that have been completed or closed for
+that long are moved to tickets_archive every ARCHIVE_INTERVAL_SECONDS, in
+batches of ARCHIVE_BATCH_SIZE, so the hot ``tickets`` table and its indexes
+only hold live work. ``python -m app.manage archive-tickets`` does the same once.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from ..database import SessionLocal, run_on_primary
+from ..settings import DATABASE_ASYNC, ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL_SECONDS, ARCHIVE_BATCH_SIZE
+from ..crud.ticket import archive_tickets
+
+logger = logging.getLogger(__name__)
+
+def _archive_batch_in_new_session(updated_before: datetime) -> int:
+    with SessionLocal() as db:
+        return archive_tickets(db, updated_before, ARCHIVE_BATCH_SIZE)
+
+async def archive_closed_tickets(days: int = ARCHIVE_AFTER_DAYS) -> int:
+    """Archive every ticket closed for more than ``days`` days, one batch per transaction."""
+    updated_before = datetime.utcnow() - timedelta(days=days)
+    total = 0
+    while True:
+        if DATABASE_ASYNC:
+            archived = await run_on_primary(archive_tickets, updated_before, ARCHIVE_BATCH_SIZE)
+        else:
+            # Keep blocking sync I/O off the event loop
+            archived = await asyncio.to_thread(_archive_batch_in_new_session, updated_before)
+        total += archived
+        if archived < ARCHIVE_BATCH_SIZE:
+            return total
+
+async def run_archival() -> None:
+    while True:
+        try:
+            archived = await archive_closed_tickets()
+            if archived:
+                logger.info("Archived %d tickets", archived)
+        except Exception:
+            logger.exception("Ticket archival failed")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
@@ -0,0 +1,135 @@
+"""Workflow step auto-assignment.
+
+Candidates are the active members of a step's assignable roles. Per-user open
+work (in-progress steps assigned to them) is tracked in memory: seeded with one
+GROUP BY over ticket_steps, then adjusted as ticket steps are rewritten, and
+reseeded every ASSIGNMENT_RESEED_SECONDS to correct drift from other processes.
+Changes made within a session's transaction are undone if it rolls back.
+"""
+import time
+from itertools import count
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from ..models.role import Role, UserRole
+from ..models.user import User
+from ..models.ticket_step import TicketStep
+from ..settings import ASSIGNMENT_STRATEGY, ASSIGNMENT_RESEED_SECONDS
+
+_lock = Lock()
+_role_members: Dict[str, Tuple[int, ...]] = {}
+_role_members_generation = 0
+_open_work: Dict[int, int] = {}
+_seeded_at: Optional[float] = None
+_round_robin: Dict[Tuple[str, ...], Iterator[int]] = {}
+# Session.info keys: the (released, assigned) changes its transaction applied, and
+# users picked in it whose assignment hasn't been counted yet
+_CHANGES = "open_work_changes"
+_PICKED = "open_work_picked"
+
+def invalidate_role_members() -> None:
+    global _role_members_generation
+    with _lock:
+        _role_members_generation += 1
+        _role_members.clear()
+
+def _get_role_members(db: Session, role_name: str) -> Tuple[int, ...]:
+    members = _role_members.get(role_name)
+    if members is not None:
+        return members
+
+    generation = _role_members_generation
+    rows = db.query(UserRole.user_id).join(Role, Role.id == UserRole.role_id).join(
+        User, User.id == UserRole.user_id
+    ).filter(Role.name == role_name, User.is_active.is_(True)).distinct().all()
+    members = tuple(sorted(user_id for (user_id,) in rows))
+    with _lock:
+        # Skip caching if an invalidation raced with the query above
+        if generation == _role_members_generation:
+            _role_members[role_name] = members
+    return members
+
+def _seed_open_work(db: Session) -> None:
+    global _seeded_at
+    # A step has one row per assignable role, so count distinct steps
+    steps = db.query(TicketStep.assignee_id, TicketStep.ticket_id, TicketStep.step_id).filter(
+        TicketStep.status == "in_progress",
+        TicketStep.assignee_id.isnot(None)
+    ).distinct().subquery()
+    rows = db.query(steps.c.assignee_id, func.count()).group_by(steps.c.assignee_id).all()
+    with _lock:
+        _open_work.clear()
+        _open_work.update({user_id: open_steps for user_id, open_steps in rows})
+        _seeded_at = time.monotonic()
+
+def _apply(released: Iterable[int], assigned: Iterable[int]) -> None:
+    with _lock:
+        for user_id in released:
+            _open_work[user_id] = max(_open_work.get(user_id, 0) - 1, 0)
+        for user_id in assigned:
+            _open_work[user_id] = _open_work.get(user_id, 0) + 1
+
+def adjust_open_work(released: Iterable[int], assigned: Iterable[int], db: Optional[Session] = None) -> None:
+    """Apply a change in open-step assignments to the in-memory counters.
+
+    Pass the session for changes made before its commit; they are undone if
+    the transaction rolls back instead.
+    """
+    released, assigned = list(released), list(assigned)
+    if db is not None:
+        # pick_assignee already counted the users it picked
+        picked = db.info.get(_PICKED, [])
+        for user_id in [user_id for user_id in assigned if user_id in picked]:
+            picked.remove(user_id)
+            assigned.remove(user_id)
+    _apply(released, assigned)
+    if db is not None:
+        db.info.setdefault(_CHANGES, []).append((released, assigned))
+
+@event.listens_for(Session, "after_commit")
+def _keep_changes(session: Session) -> None:
+    session.info.pop(_CHANGES, None)
+    # Picks the transaction didn't end up assigning
+    _apply(session.info.pop(_PICKED, []), [])
+
+@event.listens_for(Session, "after_transaction_end")
+def _undo_changes(session: Session, transaction) -> None:
+    # Runs after _keep_changes on commit, so anything left was rolled back
+    if transaction.parent is None:
+        session.info.pop(_PICKED, None)
+        for released, assigned in reversed(session.info.pop(_CHANGES, [])):
+            _apply(assigned, released)
+
+def pick_assignee(db: Session, roles: List[str], strategy: str = ASSIGNMENT_STRATEGY) -> Optional[int]:
+    """Pick a member of ``roles`` and count the step against them right away.
+
+    Steps started together (several root steps, bulk creates) are spread out
+    this way. The pick is confirmed when ``adjust_open_work`` counts the
+    assignment in the same transaction, and undone if it rolls back.
+    """
+    if not roles:
+        return None
+    candidates: Set[int] = set()
+    for role_name in roles:
+        candidates.update(_get_role_members(db, role_name))
+    if not candidates:
+        return None
+
+    if strategy == "round_robin":
+        ordered = sorted(candidates)
+        key = tuple(sorted(roles))
+        with _lock:
+            turn = next(_round_robin.setdefault(key, count()))
+            user_id = ordered[turn % len(ordered)]
+            _open_work[user_id] = _open_work.get(user_id, 0) + 1
+    else:
+        if _seeded_at is None or time.monotonic() - _seeded_at > ASSIGNMENT_RESEED_SECONDS:
+            _seed_open_work(db)
+        with _lock:
+            user_id = min(candidates, key=lambda candidate: (_open_work.get(candidate, 0), candidate))
+            _open_work[user_id] = _open_work.get(user_id, 0) + 1
+    db.info.setdefault(_CHANGES, []).append(([], [user_id]))
+    db.info.setdefault(_PICKED, []).append(user_id)
+    return user_id
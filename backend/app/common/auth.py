@@ -1,19 +1,36 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from threading import Lock
+from typing import Optional, Dict, Tuple, Any, Callable, Union
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from ..settings import SECRET_KEY, ALGORITHM
-from ..database import get_db
+from ..settings import (
+    SECRET_KEY, ALGORITHM, AUTH_STATELESS_TOKENS, AUTH_TOKEN_CACHE_SIZE, AUTH_SECURITY_VERSION_TTL_SECONDS,
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS
+)
+from ..database import get_read_session, run_in_session, run_on_primary, engine, read_engine
 from ..schemas.user import User
 from ..models.user import User as UserModel
 
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost than BCRYPT_ROUNDS are flagged for rehashing on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # Auth Models
@@ -29,14 +46,112 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+class TokenUser:
+    """Current user resolved from verified token claims.
+
+    Only ``id`` and ``username`` are known up front. With a sync session the
+    user row is loaded the first time a handler touches any other attribute;
+    with an ``AsyncSession`` that would block the event loop, so handlers
+    await ``load_current_user`` first.
+    """
+
+    def __init__(self, user_id: int, username: str, db: Union[Session, AsyncSession]):
+        self.id = user_id
+        self.username = username
+        self._db = db
+        self._user: Optional[UserModel] = None
+
+    def _set_user(self, user: Optional[UserModel]) -> UserModel:
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        self._user = user
+        return user
+
+    async def load(self) -> UserModel:
+        if self._user is None:
+            user = await run_in_session(self._db, _query_user_by_id, self.id)
+            if user is None and read_engine is not engine:
+                user = await run_on_primary(_query_user_by_id, self.id)
+            self._set_user(user)
+        return self._user
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._user is None:
+            if not isinstance(self._db, Session):
+                raise RuntimeError(f"Await load_current_user() before reading current_user.{name}")
+            self._set_user(_query_user_by_id(self._db, self.id))
+        return getattr(self._user, name)
+
+async def load_current_user(current_user: Union[UserModel, TokenUser]) -> UserModel:
+    """The user row behind ``current_user``, for handlers that need more than ``id`` and ``username``."""
+    if isinstance(current_user, TokenUser):
+        return await current_user.load()
+    return current_user
+
+# Decoded token payloads keyed by token hash, kept until the token expires
+_token_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_token_cache_lock = Lock()
+
+# Last known security version per user id with the time it was read
+_security_versions: Dict[int, Tuple[int, float]] = {}
+
+def _decode_token_cached(token: str) -> Dict[str, Any]:
+    key = hashlib.sha256(token.encode()).hexdigest()
+    now = time.time()
+    with _token_cache_lock:
+        payload = _token_cache.get(key)
+        if payload is not None:
+            if payload["exp"] > now:
+                _token_cache.move_to_end(key)
+                return payload
+            del _token_cache[key]
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    with _token_cache_lock:
+        _token_cache[key] = payload
+        if len(_token_cache) > AUTH_TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return payload
+
+def set_security_version(user_id: int, version: Optional[int]) -> None:
+    if version is None:
+        _security_versions.pop(user_id, None)
+    else:
+        _security_versions[user_id] = (version, time.time())
+
+def _query_security_version(db: Session, user_id: int) -> Optional[int]:
+    return db.query(UserModel.security_version).filter(UserModel.id == user_id).scalar()
+
+def _query_user_by_id(db: Session, user_id: int) -> Optional[UserModel]:
+    return db.query(UserModel).filter(UserModel.id == user_id).first()
+
+def _query_user_by_username(db: Session, username: str) -> Optional[UserModel]:
+    return db.query(UserModel).filter(UserModel.username == username).first()
+
+async def _get_security_version(db: Union[Session, AsyncSession], user_id: int) -> Optional[int]:
+    cached = _security_versions.get(user_id)
+    if cached is not None and time.time() - cached[1] < AUTH_SECURITY_VERSION_TTL_SECONDS:
+        return cached[0]
+    version = await run_in_session(db, _query_security_version, user_id)
+    if version is None and read_engine is not engine:
+        # A user created moments ago may not have reached the read replica yet
+        version = await run_on_primary(_query_security_version, user_id)
+    set_security_version(user_id, version)
+    return version
+
+def create_token_claims(user: UserModel) -> Dict[str, Any]:
+    return {"sub": user.username, "uid": user.id, "sv": user.security_version or 0}
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_session)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_token_cached(token) if AUTH_STATELESS_TOKENS else jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -44,9 +159,19 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
 
-    user = db.query(UserModel).filter(UserModel.username == token_data.username).first()
+    # Fast path: trust the verified claims and only check the security version
+    if AUTH_STATELESS_TOKENS and "uid" in payload and "sv" in payload:
+        if await _get_security_version(db, payload["uid"]) != payload["sv"]:
+            raise credentials_exception
+        return TokenUser(payload["uid"], token_data.username, db)
+
+    user = await run_in_session(db, _query_user_by_username, token_data.username)
+    if user is None and read_engine is not engine:
+        user = await run_on_primary(_query_user_by_username, token_data.username)
     if user is None:
         raise credentials_exception
+    if "sv" in payload and payload["sv"] != user.security_version:
+        raise credentials_exception
     return user
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -55,6 +180,36 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop.
+# The semaphore bounds in-flight work; callers wait for a slot up to the queue timeout.
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_slots = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+
+async def _run_password_hashing(func: Callable, *args):
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), timeout=PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent authentication requests, please retry",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_slots.release()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password in the hashing pool.
+
+    Returns ``(verified, new_hash)`` where ``new_hash`` is set when the stored
+    hash was made with outdated settings and should be replaced.
+    """
+    return await _run_password_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_hashing(pwd_context.hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,142 @@
+"""Transparent compression for large JSON columns.
+
+With ``JSON_COMPRESSION`` set to "zlib" or "zstd", columns declared with
+``json_column`` store compressed JSON bytes instead of JSON. Each value starts
+with a header naming its codec and the dictionary it was compressed with, so
+rows written before compression was enabled, with another codec or with an
+older dictionary keep reading back. Values are only decompressed when the
+column is loaded; list routes leave these columns out unless asked for them.
+
+zstd dictionaries are trained from existing rows with
+``python -m app.manage train-json-dictionary`` and kept in the
+compression_dictionaries table; ``python -m app.manage compress-json-columns``
+rewrites existing rows.
+"""
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Optional
+
+import orjson
+from sqlalchemy import JSON, LargeBinary, select
+from sqlalchemy.types import TypeDecorator
+
+from ..settings import JSON_COMPRESSION, JSON_COMPRESSION_LEVEL, JSON_COMPRESSION_MIN_BYTES
+
+try:
+    import zstandard
+except ImportError:  # Only needed for JSON_COMPRESSION=zstd
+    zstandard = None
+
+if JSON_COMPRESSION not in ("", "zlib", "zstd"):
+    raise ValueError(f"Unknown JSON_COMPRESSION '{JSON_COMPRESSION}'")
+if JSON_COMPRESSION == "zstd" and zstandard is None:
+    raise RuntimeError("JSON_COMPRESSION=zstd requires the zstandard package")
+
+# A JSON document can't start with 0x1f, so uncompressed values need no header
+MAGIC = b"\x1fXJ"
+ZLIB, ZSTD = 1, 2
+_HEADER = struct.Struct(">3sBI")  # magic, codec, dictionary id (0 = none)
+
+# Dictionary id -> zstd dictionary, and column -> id of the dictionary new values use
+_dictionaries: Dict[int, Any] = {}
+_active: Dict[str, int] = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+def _dictionary(dictionary_id: int) -> Any:
+    dictionary = _dictionaries.get(dictionary_id)
+    if dictionary is None:
+        # Written by another process after this one loaded its dictionaries
+        from ..database import engine
+        with engine.connect() as conn:
+            load_dictionaries(conn)
+        dictionary = _dictionaries.get(dictionary_id)
+        if dictionary is None:
+            raise ValueError(f"Compression dictionary {dictionary_id} not found")
+    return dictionary
+
+def load_dictionaries(conn: Any) -> None:
+    """Load stored zstd dictionaries; the newest one per column compresses new values."""
+    if zstandard is None:
+        return
+    from ..models.compression_dictionary import CompressionDictionary
+    rows = conn.execute(
+        select(CompressionDictionary.id, CompressionDictionary.column, CompressionDictionary.data)
+        .order_by(CompressionDictionary.id)
+    ).all()
+    with _lock:
+        for row in rows:
+            if row.id not in _dictionaries:
+                _dictionaries[row.id] = zstandard.ZstdCompressionDict(row.data)
+            _active[row.column] = row.id
+
+def _compressor(dictionary_id: int) -> Any:
+    # zstd (de)compressors are not thread-safe; keep one per thread and dictionary
+    compressors = _local.__dict__.setdefault("compressors", {})
+    compressor = compressors.get(dictionary_id)
+    if compressor is None:
+        dictionary = _dictionary(dictionary_id) if dictionary_id else None
+        compressor = zstandard.ZstdCompressor(level=JSON_COMPRESSION_LEVEL or 3, dict_data=dictionary)
+        compressors[dictionary_id] = compressor
+    return compressor
+
+def _decompressor(dictionary_id: int) -> Any:
+    decompressors = _local.__dict__.setdefault("decompressors", {})
+    decompressor = decompressors.get(dictionary_id)
+    if decompressor is None:
+        dictionary = _dictionary(dictionary_id) if dictionary_id else None
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+        decompressors[dictionary_id] = decompressor
+    return decompressor
+
+def encode(column: str, value: Any) -> Optional[bytes]:
+    """``value`` as stored bytes: JSON, compressed once it's large enough."""
+    if value is None:
+        return None
+    data = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    if not JSON_COMPRESSION or len(data) < JSON_COMPRESSION_MIN_BYTES:
+        return data
+    if JSON_COMPRESSION == "zlib":
+        return _HEADER.pack(MAGIC, ZLIB, 0) + zlib.compress(data, JSON_COMPRESSION_LEVEL or 6)
+    dictionary_id = _active.get(column, 0)
+    return _HEADER.pack(MAGIC, ZSTD, dictionary_id) + _compressor(dictionary_id).compress(data)
+
+def decode(value: Any) -> Any:
+    """Inverse of ``encode``; also reads plain JSON written before compression was enabled."""
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return value
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if isinstance(value, str) or not value.startswith(MAGIC):
+        return orjson.loads(value)
+    _, codec, dictionary_id = _HEADER.unpack_from(value)
+    payload = value[_HEADER.size:]
+    if codec == ZLIB:
+        return orjson.loads(zlib.decompress(payload))
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Reading zstd-compressed JSON requires the zstandard package")
+        return orjson.loads(_decompressor(dictionary_id).decompress(payload))
+    raise ValueError(f"Unknown JSON compression codec {codec}")
+
+class CompressedJSON(TypeDecorator):
+    """JSON stored as (compressed) bytes; ``column`` selects the zstd dictionary."""
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, column: str):
+        super().__init__()
+        self.column = column
+
+    def process_bind_param(self, value: Any, dialect: Any) -> Optional[bytes]:
+        return encode(self.column, value)
+
+    def process_result_value(self, value: Any, dialect: Any) -> Any:
+        return decode(value)
+
+def json_column(column: str) -> Any:
+    """Type for a large JSON column: ``CompressedJSON`` when compression is enabled."""
+    return CompressedJSON(column) if JSON_COMPRESSION else JSON
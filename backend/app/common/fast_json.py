@@ -0,0 +1,29 @@
+"""JSON list responses encoded straight from Core rows.
+
+Big list endpoints skip ORM hydration, ``response_model`` validation and
+``jsonable_encoder``: they select plain column values and encode them with
+orjson, a chunk of rows at a time while the body streams out. orjson renders the
+types these columns hold (str, numbers, bools, JSON, datetimes with a "Z" suffix
+for UTC) the same way Pydantic does, so the route's ``response_model`` still
+documents the body. Only columns the schema exposes may be selected.
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+STREAM_CHUNK_ROWS = 500
+_OPTIONS = orjson.OPT_UTC_Z
+
+async def _json_array(rows: List[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    yield b"["
+    for start in range(0, len(rows), STREAM_CHUNK_ROWS):
+        chunk = orjson.dumps(rows[start:start + STREAM_CHUNK_ROWS], option=_OPTIONS)
+        if start:
+            yield b","
+        # Drop the chunk's own brackets
+        yield chunk[1:-1]
+    yield b"]"
+
+def json_rows_response(rows: List[Dict[str, Any]], headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    return StreamingResponse(_json_array(rows), media_type="application/json", headers=headers)
@@ -0,0 +1,58 @@
+"""Sparse fieldsets for list endpoints (``?fields=title,status``).
+
+Only the requested columns are selected, so heavy JSON columns that a list view
+doesn't show are never read or serialized. Such columns are left out unless a
+client asks for them by name or with ``fields=*``.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import Query, Session
+
+_partial_models: Dict[Type[BaseModel], Type[BaseModel]] = {}
+
+def parse_fields(
+    fields: Optional[str],
+    model: Any,
+    schema: Type[BaseModel],
+    deferred: Sequence[str] = (),
+    required: Sequence[str] = ("id",)
+) -> Tuple[str, ...]:
+    """Columns of ``model`` to select for a ``fields`` query parameter.
+
+    Selectable columns are those ``schema`` exposes. Without ``fields``, all of
+    them except ``deferred`` are selected. ``required`` columns, such as the
+    keys a cursor is built from, are always included.
+    """
+    selectable = [attr.key for attr in inspect(model).column_attrs if attr.key in schema.model_fields]
+    if fields is None:
+        requested = [field for field in selectable if field not in deferred]
+    elif fields.strip() == "*":
+        requested = selectable
+    else:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in selectable]
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys([*required, *requested]))
+
+def select_columns(db: Session, model: Any, columns: Sequence[str]) -> Query:
+    return db.query(*[getattr(model, column) for column in columns])
+
+def rows_to_dicts(rows: List[Any]) -> List[Dict[str, Any]]:
+    return [row._asdict() for row in rows]
+
+def partial_model(schema: Type[BaseModel]) -> Type[BaseModel]:
+    """``schema`` with every field optional, for responses carrying a subset of fields.
+
+    Use with ``response_model_exclude_unset`` so fields that weren't selected are
+    left out instead of returned as null.
+    """
+    partial = _partial_models.get(schema)
+    if partial is None:
+        overrides = {name: (Optional[field.annotation], None) for name, field in schema.model_fields.items()}
+        partial = create_model(f"{schema.__name__}Fields", __base__=schema, **overrides)
+        _partial_models[schema] = partial
+    return partial
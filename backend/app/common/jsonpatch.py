@@ -0,0 +1,144 @@
+"""JSON Patch (RFC 6902) and JSON Merge Patch (RFC 7396) for plain JSON documents.
+
+Patches never modify their input; containers along each changed path are copied,
+everything else is shared with the original document.
+"""
+from typing import Any, Dict, List, Tuple
+
+class PatchError(ValueError):
+    pass
+
+class PatchTestFailed(PatchError):
+    pass
+
+_MISSING = object()
+
+def _parse_pointer(pointer: str) -> List[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer '{pointer}'")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+def _list_index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"Invalid array index '{token}'")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index {index} out of range")
+    return index
+
+def _get(document: Any, tokens: List[str]) -> Any:
+    value = document
+    for token in tokens:
+        if isinstance(value, dict):
+            if token not in value:
+                raise PatchError(f"Path '/{'/'.join(tokens)}' does not exist")
+            value = value[token]
+        elif isinstance(value, list):
+            value = value[_list_index(value, token)]
+        else:
+            raise PatchError(f"Path '/{'/'.join(tokens)}' does not exist")
+    return value
+
+def _copy(container: Any) -> Any:
+    return dict(container) if isinstance(container, dict) else list(container)
+
+def _set(document: Any, tokens: List[str], value: Any, insert: bool) -> Any:
+    """Return a copy of ``document`` with ``value`` added or replaced at ``tokens``."""
+    if not tokens:
+        return value
+    parent = _copy(document) if isinstance(document, (dict, list)) else _MISSING
+    if parent is _MISSING:
+        raise PatchError("Cannot set a member of a scalar value")
+    token, rest = tokens[0], tokens[1:]
+    if rest:
+        child = _get(parent, [token])
+        if isinstance(parent, list):
+            parent[_list_index(parent, token)] = _set(child, rest, value, insert)
+        else:
+            parent[token] = _set(child, rest, value, insert)
+        return parent
+
+    if isinstance(parent, dict):
+        if not insert and token not in parent:
+            raise PatchError(f"Cannot replace missing member '{token}'")
+        parent[token] = value
+    else:
+        index = _list_index(parent, token, allow_end=insert)
+        if insert:
+            parent.insert(index, value)
+        else:
+            parent[index] = value
+    return parent
+
+def _remove(document: Any, tokens: List[str]) -> Tuple[Any, Any]:
+    """Return (copy of ``document`` without the value at ``tokens``, removed value)."""
+    if not tokens:
+        raise PatchError("Cannot remove the whole document")
+    token, rest = tokens[0], tokens[1:]
+    if not isinstance(document, (dict, list)):
+        raise PatchError(f"Path '/{'/'.join(tokens)}' does not exist")
+    parent = _copy(document)
+    if rest:
+        child = _get(parent, [token])
+        updated, removed = _remove(child, rest)
+        if isinstance(parent, list):
+            parent[_list_index(parent, token)] = updated
+        else:
+            parent[token] = updated
+        return parent, removed
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise PatchError(f"Cannot remove missing member '{token}'")
+        return parent, parent.pop(token)
+    return parent, parent.pop(_list_index(parent, token))
+
+def apply_patch(document: Any, operations: List[Dict[str, Any]]) -> Any:
+    """Apply an RFC 6902 operation list to ``document``."""
+    if not isinstance(operations, list):
+        raise PatchError("A JSON Patch must be an array of operations")
+    for operation in operations:
+        if not isinstance(operation, dict) or "op" not in operation or "path" not in operation:
+            raise PatchError("Each operation needs 'op' and 'path'")
+        op = operation["op"]
+        path = _parse_pointer(operation["path"])
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"'{op}' operation needs a 'value'")
+        if op == "add":
+            document = _set(document, path, operation["value"], insert=True)
+        elif op == "replace":
+            document = _set(document, path, operation["value"], insert=False)
+        elif op == "remove":
+            document, _ = _remove(document, path)
+        elif op in ("move", "copy"):
+            if "from" not in operation:
+                raise PatchError(f"'{op}' operation needs 'from'")
+            source = _parse_pointer(operation["from"])
+            if op == "move":
+                if path[:len(source)] == source and path != source:
+                    raise PatchError("Cannot move a value into one of its children")
+                document, value = _remove(document, source)
+            else:
+                value = _get(document, source)
+            document = _set(document, path, value, insert=True)
+        elif op == "test":
+            if _get(document, path) != operation["value"]:
+                raise PatchTestFailed(f"Test failed at '{operation['path']}'")
+        else:
+            raise PatchError(f"Unknown operation '{op}'")
+    return document
+
+def apply_merge_patch(document: Any, patch: Any) -> Any:
+    """Apply an RFC 7396 merge patch to ``document``."""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(document) if isinstance(document, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
@@ -0,0 +1,99 @@
+import base64
+import json
+from datetime import datetime, date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import functions
+from sqlalchemy.sql.elements import Label
+
+MAX_PAGE_SIZE = 1000
+
+# Ordering for keyset pagination: (column, descending) pairs. The last column
+# must be unique (normally the primary key) so the order is total.
+Order = Sequence[Tuple[Any, bool]]
+
+def nulls_as(column: Any, value: Any) -> Any:
+    """Sort key for a nullable column that orders and compares NULL as ``value``.
+
+    Comparisons with NULL are never true, so a plain nullable sort key makes
+    keyset pages skip or repeat rows where it is NULL.
+    """
+    return func.coalesce(column, value).label(column.key)
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+def _decode_value(value: dict) -> Any:
+    if "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    if "$d" in value:
+        return date.fromisoformat(value["$d"])
+    return value
+
+def _row_value(row: Any, column: Any) -> Any:
+    if hasattr(row, "_mapping"):
+        value = row._mapping[column.key]
+    elif isinstance(row, dict):
+        value = row[column.key]
+    else:
+        value = getattr(row, column.key)
+    if value is None and isinstance(column, Label) and isinstance(column.element, functions.coalesce):
+        # What a nulls_as() key compares the row as
+        value = column.element.clauses.clauses[-1].value
+    return value
+
+def encode_cursor(order: Order, row: Any) -> str:
+    payload = {"k": [column.key for column, _ in order], "v": [_row_value(row, column) for column, _ in order]}
+    raw = json.dumps(payload, default=_encode_value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(order: Order, cursor: str) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw, object_hook=_decode_value)
+        keys, values = payload["k"], payload["v"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if keys != [column.key for column, _ in order] or len(values) != len(order):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor does not match the requested sort")
+    return values
+
+def after_cursor_clause(order: Order, cursor: str):
+    """Rows strictly after the cursor position, as a lexicographic comparison."""
+    values = decode_cursor(order, cursor)
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        equal_prefix = [order[j][0] == values[j] for j in range(i)]
+        comparison = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, comparison))
+    return or_(*clauses)
+
+def order_clauses(order: Order) -> List[Any]:
+    return [column.desc() if descending else column.asc() for column, descending in order]
+
+def paginate(query: Query, order: Order, after: Optional[str] = None, skip: int = 0, limit: int = 100) -> Query:
+    if after:
+        query = query.filter(after_cursor_clause(order, after))
+    query = query.order_by(*order_clauses(order))
+    if skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def next_cursor(order: Order, items: List[Any], limit: int) -> Optional[str]:
+    # A full page means there may be more rows after the last one
+    if not items or len(items) < limit:
+        return None
+    return encode_cursor(order, items[-1])
+
+def next_cursor_headers(order: Order, items: List[Any], limit: int) -> Dict[str, str]:
+    cursor = next_cursor(order, items, limit)
+    return {"X-Next-Cursor": cursor} if cursor else {}
+
+def set_next_cursor(response: Response, order: Order, items: List[Any], limit: int) -> None:
+    response.headers.update(next_cursor_headers(order, items, limit))
@@ -3,7 +3,7 @@ from typing import List, Callable
 from inspect import iscoroutinefunction
 from fastapi import HTTPException, Depends, status
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import get_session, run_on_primary
 from ..models.user import User
 from .auth import get_current_user
 from ..crud import role as crud_role
@@ -11,13 +11,12 @@ from ..crud import role as crud_role
 def has_permissions(required_permissions: List[str]):
     def decorator(func: Callable):
         @wraps(func)
-        async def wrapper(*args, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), **kwargs):
-            # Get all user roles and their permissions
-            user_roles = crud_role.get_user_roles(db=db, user_id=current_user.id)
-            user_permissions = set()
-            for user_role in user_roles:
-                role = crud_role.get_role(db, user_role.role_id)
-                user_permissions.update(role.permissions)
+        async def wrapper(*args, db: Session = Depends(get_session), current_user: User = Depends(get_current_user), **kwargs):
+            # Get the user's compiled permission set (cached per user). Misses are
+            # loaded from the primary so a lagging replica can't cache stale roles.
+            user_permissions = crud_role.get_cached_user_permissions(current_user.id)
+            if user_permissions is None:
+                user_permissions = await run_on_primary(crud_role.get_user_permissions, user_id=current_user.id)
             
             # Check if user has wildcard permission or all required permissions
             has_wildcard = '*' in user_permissions
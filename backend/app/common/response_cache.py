@@ -0,0 +1,99 @@
+"""Conditional GETs and cached response bodies for rarely changing resources.
+
+Responses are cached per namespace ("templates", "resource_types", "roles") and
+request URL as serialized JSON. CRUD write paths call ``invalidate(namespace)``,
+which bumps the namespace's generation and drops its entries. ETags hash the
+serialized body, so they match across processes and restarts exactly when the
+content does, and revalidating a cached resource costs a header comparison
+instead of a query and a serialization.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from ..settings import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+    headers: Dict[str, str]
+    generation: int
+    stored_at: float
+
+_entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+_generations: Dict[str, int] = {}
+_adapters: Dict[Any, TypeAdapter] = {}
+_lock = Lock()
+
+def invalidate(namespace: str) -> None:
+    with _lock:
+        _generations[namespace] = _generations.get(namespace, 0) + 1
+        for key in [key for key in _entries if key[0] == namespace]:
+            del _entries[key]
+
+def _lookup(key: Tuple[str, str]) -> Optional[CachedResponse]:
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        if entry.generation != _generations.get(key[0], 0) or time.monotonic() - entry.stored_at > RESPONSE_CACHE_TTL_SECONDS:
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        return entry
+
+def _store(key: Tuple[str, str], entry: CachedResponse) -> None:
+    with _lock:
+        # A write that committed while the response was being built made it stale
+        if entry.generation != _generations.get(key[0], 0):
+            return
+        _entries[key] = entry
+        _entries.move_to_end(key)
+        while len(_entries) > RESPONSE_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()[:32]}"'
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison
+    return header.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+async def cached_json(
+    request: Request,
+    namespace: str,
+    response_model: Any,
+    load: Callable[[], Awaitable[Tuple[Any, Dict[str, str]]]],
+    exclude_unset: bool = False
+) -> Response:
+    """Answer a GET from the cache, calling ``load`` only on a miss.
+
+    ``load`` returns the content to serialize as ``response_model`` and any extra
+    response headers (such as ``X-Next-Cursor``). Exceptions it raises, e.g. a
+    404, propagate and are not cached. ``exclude_unset`` leaves out fields the
+    content doesn't carry, for sparse fieldsets.
+    """
+    key = (namespace, f"{request.url.path}?{request.url.query}")
+    entry = _lookup(key)
+    if entry is None:
+        generation = _generations.get(namespace, 0)
+        content, headers = await load()
+        adapter = _adapters.get(response_model)
+        if adapter is None:
+            adapter = _adapters.setdefault(response_model, TypeAdapter(response_model))
+        body = adapter.dump_json(adapter.validate_python(content, from_attributes=True), exclude_unset=exclude_unset)
+        entry = CachedResponse(_etag(body), body, headers, generation, time.monotonic())
+        _store(key, entry)
+
+    cache_headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if _not_modified(request, entry.etag):
+        return Response(status_code=304, headers=cache_headers)
+    return Response(content=entry.body, media_type="application/json", headers={**entry.headers, **cache_headers})
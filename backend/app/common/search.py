@@ -0,0 +1,168 @@
+"""Full-text search indexes: SQLite FTS5 tables, or PostgreSQL tsvector columns with a GIN index.
+
+Each ``SearchIndex`` holds one document per row it indexes (``doc_id``),
+optionally tagged with a ``group_id`` to search within (such as a resource
+type). Documents are kept current by the CRUD write paths and can be rebuilt
+offline with the ``python -m app.manage`` commands.
+
+Queries are split into words, every word must match, and each word also
+matches as a prefix. ``match`` returns a subquery of ``doc_id`` and ``rank``
+(lower is better) to join and paginate against; ``snippets`` highlights the
+matched words of a page of results.
+"""
+import html
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+class SearchIndex(NamedTuple):
+    name: str
+    columns: Sequence[str]
+    # Relative importance of each column; PostgreSQL maps them onto weights A-D in order
+    weights: Sequence[float]
+
+RESOURCE_ENTRIES = SearchIndex("resource_entry_search", ("body",), (1.0,))
+# form_text holds the values entered in every step's form
+TICKETS = SearchIndex("ticket_search", ("title", "description", "form_text"), (10.0, 4.0, 1.0))
+
+INDEXES = (RESOURCE_ENTRIES, TICKETS)
+
+# Highlight markers; snippets are HTML-escaped and then get <mark> tags
+_START, _STOP = "\x02", "\x03"
+_WORD = re.compile(r"\w+", re.UNICODE)
+_PG_WEIGHTS = "ABCD"
+
+def _dialect(db: Any) -> str:
+    bind = db.get_bind() if isinstance(db, Session) else db
+    return bind.dialect.name
+
+def _table(index: SearchIndex):
+    return table(index.name, column("doc_id"), column("group_id"), column("document"), *map(column, index.columns))
+
+def create_indexes(engine: Any) -> None:
+    """Create missing search tables for every index in ``INDEXES``."""
+    with engine.begin() as conn:
+        for index in INDEXES:
+            if engine.dialect.name == "postgresql":
+                columns = ", ".join(f"{name} text" for name in index.columns)
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {index.name} "
+                    f"(doc_id integer PRIMARY KEY, group_id integer, {columns}, document tsvector)"
+                ))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{index.name}_document ON {index.name} USING gin (document)"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{index.name}_group_id ON {index.name} (group_id)"))
+            else:
+                # rowid is the doc_id; prefix indexes keep short prefix queries fast
+                columns = ", ".join(index.columns)
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {index.name} USING fts5("
+                    f"{columns}, group_id UNINDEXED, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+                ))
+
+def remove_documents(db: Session, index: SearchIndex, doc_ids: Sequence[int]) -> None:
+    if not doc_ids:
+        return
+    key = "doc_id" if _dialect(db) == "postgresql" else "rowid"
+    db.execute(_table(index).delete().where(literal_column(key).in_(list(doc_ids))))
+
+def index_documents(db: Session, index: SearchIndex, documents: Sequence[Dict[str, Any]]) -> None:
+    """Add or replace documents: dicts of ``doc_id``, ``group_id`` and a text per column."""
+    if not documents:
+        return
+    remove_documents(db, index, [document["doc_id"] for document in documents])
+    columns = ", ".join(index.columns)
+    values = ", ".join(f":{name}" for name in index.columns)
+    rows = [{"group_id": None, **{name: "" for name in index.columns}, **document} for document in documents]
+    if _dialect(db) == "postgresql":
+        vector = " || ".join(
+            f"setweight(to_tsvector('simple', coalesce(:{name}, '')), '{_PG_WEIGHTS[min(position, 3)]}')"
+            for position, name in enumerate(_by_weight(index))
+        )
+        db.execute(text(
+            f"INSERT INTO {index.name} (doc_id, group_id, {columns}, document) VALUES (:doc_id, :group_id, {values}, {vector})"
+        ), rows)
+    else:
+        db.execute(text(
+            f"INSERT INTO {index.name} (rowid, group_id, {columns}) VALUES (:doc_id, :group_id, {values})"
+        ), rows)
+
+def clear(db: Session, index: SearchIndex, group_id: Optional[int] = None) -> None:
+    """Remove every document, or those of one group."""
+    fts = _table(index)
+    query = fts.delete()
+    if group_id is not None:
+        query = query.where(fts.c.group_id == group_id)
+    db.execute(query)
+
+def optimize(db: Session, index: SearchIndex) -> None:
+    """Compact the index after a bulk rebuild."""
+    if _dialect(db) == "postgresql":
+        return
+    db.execute(text(f"INSERT INTO {index.name} ({index.name}) VALUES ('optimize')"))
+
+def _by_weight(index: SearchIndex) -> List[str]:
+    return [name for _, name in sorted(zip(index.weights, index.columns), key=lambda item: -item[0])]
+
+def _words(q: str) -> List[str]:
+    words = _WORD.findall(q.lower())
+    if not words:
+        raise ValueError("Search query has no words")
+    return words
+
+def match(db: Session, index: SearchIndex, q: str, group_id: Optional[int] = None):
+    """Subquery of (doc_id, rank) for the documents matching every word of ``q``."""
+    words = _words(q)
+    fts = _table(index)
+    if _dialect(db) == "postgresql":
+        query = func.to_tsquery("simple", " & ".join(f"{word}:*" for word in words))
+        statement = select(
+            fts.c.doc_id.label("doc_id"),
+            # ts_rank grows with relevance; negate it so lower is better on both dialects
+            (-func.ts_rank(fts.c.document, query)).label("rank")
+        ).where(fts.c.document.op("@@")(query))
+    else:
+        query = " ".join(f'"{word}"*' for word in words)
+        statement = select(
+            literal_column("rowid").label("doc_id"),
+            func.bm25(literal_column(index.name), *index.weights).label("rank")
+        ).select_from(fts).where(literal_column(index.name).op("MATCH")(query))
+    if group_id is not None:
+        statement = statement.where(fts.c.group_id == group_id)
+    return statement.subquery()
+
+def snippets(db: Session, index: SearchIndex, q: str, doc_ids: Sequence[int], words: int = 12) -> Dict[int, str]:
+    """doc_id -> HTML-escaped excerpt with the matched words wrapped in <mark>."""
+    if not doc_ids:
+        return {}
+    terms = _words(q)
+    fts = _table(index)
+    if _dialect(db) == "postgresql":
+        query = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        document = func.concat_ws(" … ", *[fts.c[name] for name in _by_weight(index)])
+        options = f"StartSel={_START}, StopSel={_STOP}, MaxWords={words}, MinWords={max(words // 3, 1)}, MaxFragments=2"
+        statement = select(fts.c.doc_id, func.ts_headline("simple", document, query, options)).where(
+            fts.c.doc_id.in_(list(doc_ids))
+        )
+    else:
+        statement = select(
+            literal_column("rowid"),
+            func.snippet(literal_column(index.name), -1, _START, _STOP, "…", words)
+        ).select_from(fts).where(
+            literal_column(index.name).op("MATCH")(" ".join(f'"{term}"*' for term in terms)),
+            literal_column("rowid").in_(list(doc_ids))
+        )
+    return {
+        doc_id: html.escape(snippet or "").replace(_START, "<mark>").replace(_STOP, "</mark>")
+        for doc_id, snippet in db.execute(statement)
+    }
+
+def document_text(values: Iterable[Any]) -> str:
+    """Searchable text of a sequence of field values; lists contribute each item."""
+    parts = []
+    for value in values:
+        for item in value if isinstance(value, list) else [value]:
+            if item is not None and item != "" and not isinstance(item, (dict, bool)):
+                parts.append(str(item))
+    return " ".join(parts)
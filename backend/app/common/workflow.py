@@ -0,0 +1,197 @@
+"""Compiled workflow graphs for ticket templates.
+
+A template's steps form a DAG through ``dependencies``. Without
+``parallel_execution``, a step that declares no dependencies waits for the step
+before it, so templates without dependencies keep running one step at a time.
+"""
+import time
+from threading import Lock
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from ..settings import TEMPLATE_CACHE_TTL_SECONDS
+
+class WorkflowError(ValueError):
+    pass
+
+class StepStateError(WorkflowError):
+    """The step is not in a state that allows the requested transition."""
+
+class CompiledWorkflow(NamedTuple):
+    order: Tuple[str, ...]
+    steps: Dict[str, Dict[str, Any]]
+    dependencies: Dict[str, Tuple[str, ...]]
+    dependents: Dict[str, Tuple[str, ...]]
+    roots: Tuple[str, ...]
+
+class TemplateSkeleton(NamedTuple):
+    """What create_ticket needs from a template, prepared once per revision.
+
+    Exposes the same attributes as the model for the fields it carries, so it can
+    stand in for a loaded template.
+    """
+    id: int
+    updated_at: Any
+    title_format: str
+    default_priority: str
+    workflow: List[Dict[str, Any]]
+    workflow_config: Dict[str, Any]
+    version_id: int
+    version: int
+    step_ids: Tuple[str, ...]
+    roots: FrozenSet[str]
+    loaded_at: float
+
+_compiled_cache: Dict[Tuple[int, Any], CompiledWorkflow] = {}
+_compiled_cache_lock = Lock()
+_skeleton_cache: Dict[int, TemplateSkeleton] = {}
+# Template versions are immutable, so their forms can be cached indefinitely
+_version_form_definitions: Dict[int, Dict[str, List[Dict[str, Any]]]] = {}
+
+def compile_workflow(workflow: List[Dict[str, Any]], parallel_execution: bool = False) -> CompiledWorkflow:
+    steps: Dict[str, Dict[str, Any]] = {}
+    for step in workflow or []:
+        if step["id"] in steps:
+            raise WorkflowError(f"Duplicate workflow step '{step['id']}'")
+        steps[step["id"]] = step
+
+    step_ids = list(steps)
+    dependencies: Dict[str, Tuple[str, ...]] = {}
+    for i, step_id in enumerate(step_ids):
+        declared = steps[step_id].get("dependencies") or []
+        for dependency in declared:
+            if dependency not in steps:
+                raise WorkflowError(f"Step '{step_id}' depends on unknown step '{dependency}'")
+        if not declared and not parallel_execution and i > 0:
+            declared = [step_ids[i - 1]]
+        dependencies[step_id] = tuple(dict.fromkeys(declared))
+
+    dependents: Dict[str, List[str]] = {step_id: [] for step_id in step_ids}
+    for step_id, step_dependencies in dependencies.items():
+        for dependency in step_dependencies:
+            dependents[dependency].append(step_id)
+
+    # Kahn's algorithm, keeping template order among ready steps
+    remaining = {step_id: len(step_dependencies) for step_id, step_dependencies in dependencies.items()}
+    ready = [step_id for step_id in step_ids if remaining[step_id] == 0]
+    roots = tuple(ready)
+    order = []
+    while ready:
+        step_id = ready.pop(0)
+        order.append(step_id)
+        for dependent in dependents[step_id]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    if len(order) != len(step_ids):
+        cyclic = ", ".join(step_id for step_id in step_ids if remaining[step_id] > 0)
+        raise WorkflowError(f"Workflow dependencies form a cycle: {cyclic}")
+
+    return CompiledWorkflow(
+        order=tuple(order),
+        steps=steps,
+        dependencies=dependencies,
+        dependents={step_id: tuple(step_dependents) for step_id, step_dependents in dependents.items()},
+        roots=roots
+    )
+
+def get_compiled_workflow(template: Any) -> CompiledWorkflow:
+    """Compile ``template``'s workflow once per template revision."""
+    key = (template.id, template.updated_at)
+    compiled = _compiled_cache.get(key)
+    if compiled is None:
+        parallel = bool((template.workflow_config or {}).get("parallel_execution"))
+        compiled = compile_workflow(template.workflow, parallel)
+        with _compiled_cache_lock:
+            # Drop compilations of older revisions of this template
+            for stale in [cached for cached in _compiled_cache if cached[0] == template.id]:
+                del _compiled_cache[stale]
+            _compiled_cache[key] = compiled
+    return compiled
+
+def get_compiled_version(version: Any) -> CompiledWorkflow:
+    """Compile a template version's workflow; versions never change, so no revision key."""
+    key = ("version", version.id)
+    compiled = _compiled_cache.get(key)
+    if compiled is None:
+        parallel = bool((version.workflow_config or {}).get("parallel_execution"))
+        compiled = compile_workflow(version.workflow, parallel)
+        with _compiled_cache_lock:
+            _compiled_cache[key] = compiled
+    return compiled
+
+def invalidate_compiled_workflow(template_id: int) -> None:
+    with _compiled_cache_lock:
+        _skeleton_cache.pop(template_id, None)
+        for stale in [cached for cached in _compiled_cache if cached[0] == template_id]:
+            del _compiled_cache[stale]
+
+def get_cached_template_skeleton(template_id: int) -> Optional[TemplateSkeleton]:
+    skeleton = _skeleton_cache.get(template_id)
+    if skeleton is None or time.monotonic() - skeleton.loaded_at > TEMPLATE_CACHE_TTL_SECONDS:
+        return None
+    return skeleton
+
+def get_version_form_definitions(version_id: int) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    return _version_form_definitions.get(version_id)
+
+def remember_version_form_definitions(version_id: int, form_definitions: Dict[str, List[Dict[str, Any]]]) -> None:
+    _version_form_definitions[version_id] = form_definitions
+
+def cache_template_skeleton(template: Any, version: Any, cache: bool = True) -> TemplateSkeleton:
+    workflow = template.workflow or []
+    skeleton = TemplateSkeleton(
+        id=template.id,
+        updated_at=template.updated_at,
+        title_format=template.title_format,
+        default_priority=template.default_priority,
+        workflow=workflow,
+        workflow_config=template.workflow_config or {
+            "parallel_execution": False,
+            "auto_assignment": False,
+            "notification_rules": []
+        },
+        version_id=version.id,
+        version=version.version,
+        step_ids=tuple(step["id"] for step in workflow),
+        roots=frozenset(get_compiled_workflow(template).roots),
+        loaded_at=time.monotonic()
+    )
+    if cache:
+        with _compiled_cache_lock:
+            _skeleton_cache[template.id] = skeleton
+    return skeleton
+
+def unblocked_steps(compiled: CompiledWorkflow, step_states: Dict[str, Dict[str, Any]], completed_step: str) -> List[str]:
+    """Pending dependents of ``completed_step`` whose dependencies have all completed."""
+    unblocked = []
+    for step_id in compiled.dependents.get(completed_step, ()):
+        if (step_states.get(step_id) or {}).get("status") != "pending":
+            continue
+        if all((step_states.get(dependency) or {}).get("status") == "completed" for dependency in compiled.dependencies[step_id]):
+            unblocked.append(step_id)
+    return unblocked
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+def validate_form(fields: List[Dict[str, Any]], form_data: Dict[str, Any]) -> List[str]:
+    errors = []
+    for field in fields or []:
+        value = form_data.get(field["id"])
+        label = field.get("label") or field["id"]
+        if _is_empty(value):
+            if field.get("required"):
+                errors.append(f"'{label}' is required")
+            continue
+        validation = field.get("validation") or {}
+        if isinstance(value, str):
+            if validation.get("min_length") is not None and len(value) < validation["min_length"]:
+                errors.append(f"'{label}' must be at least {validation['min_length']} characters")
+            if validation.get("max_length") is not None and len(value) > validation["max_length"]:
+                errors.append(f"'{label}' must be at most {validation['max_length']} characters")
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if validation.get("min") is not None and value < validation["min"]:
+                errors.append(f"'{label}' must be at least {validation['min']}")
+            if validation.get("max") is not None and value > validation["max"]:
+                errors.append(f"'{label}' must be at most {validation['max']}")
+    return errors
@@ -0,0 +1,112 @@
+"""Group commit for small, high-frequency writes.
+
+With WRITE_COALESCING enabled, writes submitted within WRITE_COALESCE_WINDOW_MS
+of each other run in one transaction on a dedicated session and share a single
+commit (one fsync). Each caller's future resolves with the row its write
+produced. If the batch fails, its writes are retried one transaction each so a
+bad write only fails its own caller.
+
+Write functions follow the CRUD signature ``func(db, *args, commit=True, **kwargs)``
+and are called with ``commit=False``.
+"""
+import asyncio
+from inspect import unwrap
+from typing import Any, Callable, List, NamedTuple, Optional, Set, Union
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import SessionLocal, run_in_session, run_on_primary
+from ..settings import (
+    DATABASE_ASYNC, WRITE_COALESCING, WRITE_COALESCE_WINDOW_MS, WRITE_COALESCE_MAX_BATCH
+)
+
+class PendingWrite(NamedTuple):
+    func: Callable
+    args: tuple
+    kwargs: dict
+    future: asyncio.Future
+
+_pending: List[PendingWrite] = []
+_flush_handle: Optional[asyncio.TimerHandle] = None
+_flush_tasks: Set[asyncio.Task] = set()
+
+def _run_batch(db: Session, batch: List[PendingWrite]) -> List[tuple]:
+    try:
+        results = [(write.func(db, *write.args, commit=False, **write.kwargs), None) for write in batch]
+        db.commit()
+        return results
+    except Exception:
+        # Also undoes the batch's open-work counter changes before the retries
+        db.rollback()
+
+    results = []
+    for write in batch:
+        try:
+            results.append((write.func(db, *write.args, commit=False, **write.kwargs), None))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            results.append((None, e))
+    return results
+
+def _run_batch_in_new_session(batch: List[PendingWrite]) -> List[tuple]:
+    with SessionLocal() as db:
+        return _run_batch(db, batch)
+
+async def _flush(batch: List[PendingWrite]) -> None:
+    try:
+        if DATABASE_ASYNC:
+            results = await run_on_primary(_run_batch, batch)
+        else:
+            # Keep blocking sync I/O off the event loop
+            results = await asyncio.to_thread(_run_batch_in_new_session, batch)
+    except Exception as e:
+        results = [(None, e)] * len(batch)
+
+    for write, (result, error) in zip(batch, results):
+        if write.future.done():
+            continue
+        if error is not None:
+            write.future.set_exception(error)
+        else:
+            write.future.set_result(result)
+
+def _start_flush() -> None:
+    global _flush_handle
+    if _flush_handle is not None:
+        _flush_handle.cancel()
+        _flush_handle = None
+    batch = _pending[:]
+    _pending.clear()
+    if batch:
+        task = asyncio.ensure_future(_flush(batch))
+        _flush_tasks.add(task)
+        task.add_done_callback(_flush_tasks.discard)
+
+async def submit(func: Callable, *args, **kwargs) -> Any:
+    global _flush_handle
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    _pending.append(PendingWrite(unwrap(func), args, kwargs, future))
+
+    if len(_pending) >= WRITE_COALESCE_MAX_BATCH:
+        _start_flush()
+    elif _flush_handle is None:
+        _flush_handle = loop.call_later(WRITE_COALESCE_WINDOW_MS / 1000, _start_flush)
+    return await future
+
+async def write(db: Union[Session, AsyncSession], func: Callable, *args, **kwargs) -> Any:
+    """Run a CRUD write through the pipeline when enabled, else on ``db``."""
+    if not WRITE_COALESCING:
+        return await run_in_session(db, unwrap(func), *args, **kwargs)
+
+    # Release the request's pooled connection while it waits for the batch
+    if isinstance(db, AsyncSession):
+        await db.commit()
+    else:
+        db.commit()
+    result = await submit(func, *args, **kwargs)
+    # The write committed on another session, so flag this one for read-your-writes routing
+    session = db.sync_session if isinstance(db, AsyncSession) else db
+    session.info["committed"] = True
+    return result
@@ -0,0 +1,44 @@
+"""Awaitable versions of the CRUD modules.
+
+Every function whose first parameter is ``db`` accepts either a ``Session`` or
+an ``AsyncSession`` and is dispatched through ``run_in_session``.
+"""
+from functools import wraps
+from inspect import isfunction, iscoroutinefunction, signature
+from types import SimpleNamespace
+from typing import Callable, Union
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import run_in_session
+from . import ticket as _ticket
+from . import ticket_template as _ticket_template
+from . import resource as _resource
+from . import user as _user
+from . import role as _role
+from . import preferences as _preferences
+
+def _awaitable(func: Callable) -> Callable:
+    @wraps(func)
+    async def wrapper(db: Union[Session, AsyncSession], *args, **kwargs):
+        return await run_in_session(db, func, *args, **kwargs)
+    return wrapper
+
+def _takes_session(func: Callable) -> bool:
+    parameters = list(signature(func).parameters)
+    return bool(parameters) and parameters[0] == "db" and not iscoroutinefunction(func)
+
+def _async_module(module) -> SimpleNamespace:
+    functions = {}
+    for name, member in vars(module).items():
+        if name.startswith("_") or not isfunction(member) or member.__module__ != module.__name__:
+            continue
+        functions[name] = _awaitable(member) if _takes_session(member) else member
+    return SimpleNamespace(**functions)
+
+ticket = _async_module(_ticket)
+ticket_template = _async_module(_ticket_template)
+resource = _async_module(_resource)
+user = _async_module(_user)
+role = _async_module(_role)
+preferences = _async_module(_preferences)
@@ -15,7 +15,6 @@ def create_user_preferences(db: Session, user_id: int, preferences: PreferencesC
     )
     db.add(db_preferences)
     db.commit()
-    db.refresh(db_preferences)
     return db_preferences
 
 def update_user_preferences(db: Session, user_id: int, preferences: PreferencesUpdate) -> Optional[UserPreferences]:
@@ -37,7 +36,6 @@ def update_user_preferences(db: Session, user_id: int, preferences: PreferencesU
         }
 
     db.commit()
-    db.refresh(db_preferences)
     return db_preferences
 
 def delete_user_preferences(db: Session, user_id: int) -> bool:
@@ -1,7 +1,143 @@
-from typing import List, Optional, Dict, Any
+import operator
+from datetime import datetime, timezone
+from typing import List, Optional, Dict, Any, Sequence, Tuple
+from sqlalchemy import column, insert, select
 from sqlalchemy.orm import Session
-from app.models.resource import ResourceType, ResourceEntry
+from app.models.resource import ResourceType, ResourceEntry, ResourceEntryIndex
 from app.schemas.resource import ResourceTypeCreate, ResourceEntryCreate, ResourceField
+from app.common.pagination import paginate
+from app.common.fieldsets import select_columns, rows_to_dicts
+from app.common import response_cache, search
+
+RESOURCE_TYPE_ORDER = ((ResourceType.id, False),)
+RESOURCE_ENTRY_ORDER = ((ResourceEntry.id, False),)
+# Left out of entry lists unless requested with ?fields=
+RESOURCE_ENTRY_DEFERRED_FIELDS = ("data",)
+# Best match first; "rank" is the search rank column of search_resource_entries
+RESOURCE_SEARCH_ORDER = ((column("rank"), False), (ResourceEntry.id, False))
+# Operators accepted in entry filters (``field:op:value``); "in" takes values separated by "|"
+ENTRY_FILTER_OPERATORS = {
+    "eq": operator.eq,
+    "in": None,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+}
+
+def _parse_date(value: Any) -> datetime:
+    parsed = datetime.fromisoformat(str(value))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _index_value(field_type: Optional[str], value: Any) -> Tuple[str, Any]:
+    """(value column, typed value) for ``value``; raises ValueError if it doesn't fit the field type."""
+    if field_type == "number":
+        return "num_value", float(value)
+    if field_type == "date":
+        return "date_value", _parse_date(value)
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    return "str_value", str(value)
+
+def _filterable_fields(resource_type: Optional[ResourceType]) -> Dict[str, Optional[str]]:
+    """Filterable field id -> field type for a resource type."""
+    if resource_type is None:
+        return {}
+    fields = resource_type.fields or []
+    if isinstance(fields, dict):
+        fields = list(fields.values())
+    types = {}
+    for field in fields:
+        field = field if isinstance(field, dict) else field.model_dump()
+        types[field.get("id")] = field.get("type")
+    filterable = (resource_type.metainfo or {}).get("filterable_fields") or []
+    return {field_id: types.get(field_id) for field_id in filterable}
+
+def _searchable_fields(resource_type: Optional[ResourceType]) -> List[str]:
+    return list(((resource_type.metainfo or {}).get("searchable_fields") or []) if resource_type else [])
+
+def _search_document(searchable: List[str], entry_id: int, resource_type_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+    body = search.document_text((data or {}).get(field_id) for field_id in searchable)
+    return {"doc_id": entry_id, "group_id": resource_type_id, "body": body}
+
+def _index_rows(filterable: Dict[str, Optional[str]], entry_id: int, resource_type_id: int, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = []
+    for field_id, field_type in filterable.items():
+        value = (data or {}).get(field_id)
+        for item in value if isinstance(value, list) else [value]:
+            if item is None or item == "":
+                continue
+            try:
+                column, typed = _index_value(field_type, item)
+            except (TypeError, ValueError):
+                # Values that don't fit the field type can't match a typed filter
+                continue
+            rows.append({"entry_id": entry_id, "resource_type_id": resource_type_id, "field": field_id, column: typed})
+    return rows
+
+def _index_entry(db: Session, entry: ResourceEntry, resource_type: Optional[ResourceType] = None) -> None:
+    """Replace the resource_entry_index rows and the search document of ``entry``."""
+    if resource_type is None:
+        resource_type = db.query(ResourceType).filter(ResourceType.id == entry.resource_type_id).first()
+    db.query(ResourceEntryIndex).filter(ResourceEntryIndex.entry_id == entry.id).delete(synchronize_session=False)
+    rows = _index_rows(_filterable_fields(resource_type), entry.id, entry.resource_type_id, entry.data)
+    if rows:
+        db.execute(insert(ResourceEntryIndex), rows)
+    searchable = _searchable_fields(resource_type)
+    search.index_documents(db, search.RESOURCE_ENTRIES, [
+        _search_document(searchable, entry.id, entry.resource_type_id, entry.data)
+    ])
+
+def reindex_resource_entries(db: Session, resource_type_id: int, batch_size: int = 500) -> int:
+    """Rebuild the filter index rows and search documents of every entry of a resource type; doesn't commit."""
+    resource_type = db.query(ResourceType).filter(ResourceType.id == resource_type_id).first()
+    filterable = _filterable_fields(resource_type)
+    searchable = _searchable_fields(resource_type)
+    db.query(ResourceEntryIndex).filter(ResourceEntryIndex.resource_type_id == resource_type_id).delete(
+        synchronize_session=False
+    )
+    search.clear(db, search.RESOURCE_ENTRIES, group_id=resource_type_id)
+    last_id, total = 0, 0
+    while True:
+        entries = db.query(ResourceEntry.id, ResourceEntry.data).filter(
+            ResourceEntry.resource_type_id == resource_type_id, ResourceEntry.id > last_id
+        ).order_by(ResourceEntry.id).limit(batch_size).all()
+        if not entries:
+            return total
+        rows = [row for entry in entries for row in _index_rows(filterable, entry.id, resource_type_id, entry.data)]
+        if rows:
+            db.execute(insert(ResourceEntryIndex), rows)
+        search.index_documents(db, search.RESOURCE_ENTRIES, [
+            _search_document(searchable, entry.id, resource_type_id, entry.data) for entry in entries
+        ])
+        last_id = entries[-1].id
+        total += len(entries)
+
+def _entry_filter(resource_type_id: int, filterable: Dict[str, Optional[str]], spec: str):
+    """SQL condition for one ``field:op:value`` filter, answered from resource_entry_index."""
+    field_id, op, raw = (spec.split(":", 2) + ["", ""])[:3]
+    if field_id not in filterable:
+        raise ValueError(f"Field '{field_id}' is not filterable")
+    if op not in ENTRY_FILTER_OPERATORS:
+        raise ValueError(f"Unknown filter operator '{op}'")
+    try:
+        values = [_index_value(filterable[field_id], item) for item in (raw.split("|") if op == "in" else [raw])]
+    except ValueError:
+        raise ValueError(f"Invalid value for field '{field_id}': '{raw}'")
+    column = getattr(ResourceEntryIndex, values[0][0])
+    if op == "in":
+        condition = column.in_([value for _, value in values])
+    else:
+        condition = ENTRY_FILTER_OPERATORS[op](column, values[0][1])
+    return ResourceEntry.id.in_(
+        select(ResourceEntryIndex.entry_id).where(
+            ResourceEntryIndex.resource_type_id == resource_type_id,
+            ResourceEntryIndex.field == field_id,
+            condition
+        )
+    )
 
 def create_resource_type(db: Session, resource_type: ResourceTypeCreate) -> ResourceType:
     # Convert fields and metainfo to JSON-serializable format
@@ -17,7 +153,7 @@ def create_resource_type(db: Session, resource_type: ResourceTypeCreate) -> Reso
     )
     db.add(db_resource_type)
     db.commit()
-    db.refresh(db_resource_type)
+    response_cache.invalidate("resource_types")
     return db_resource_type
 
 def get_resource_type(db: Session, resource_type_id: int) -> Optional[ResourceType]:
@@ -27,8 +163,8 @@ def get_resource_type(db: Session, resource_type_id: int) -> Optional[ResourceTy
         db_resource_type.fields = [ResourceField(**field_data) for field_data in db_resource_type.fields.values()]
     return db_resource_type
 
-def get_resource_types(db: Session, skip: int = 0, limit: int = 100) -> List[ResourceType]:
-    db_resource_types = db.query(ResourceType).offset(skip).limit(limit).all()
+def get_resource_types(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None) -> List[ResourceType]:
+    db_resource_types = paginate(db.query(ResourceType), RESOURCE_TYPE_ORDER, after=after, skip=skip, limit=limit).all()
     for resource_type in db_resource_types:
         if resource_type and isinstance(resource_type.fields, dict):
             # Convert dict fields back to list of ResourceField objects
@@ -38,28 +174,38 @@ def get_resource_types(db: Session, skip: int = 0, limit: int = 100) -> List[Res
 def update_resource_type(db: Session, resource_type_id: int, resource_type: ResourceTypeCreate) -> Optional[ResourceType]:
     db_resource_type = get_resource_type(db, resource_type_id)
     if db_resource_type:
+        indexed = (_filterable_fields(db_resource_type), _searchable_fields(db_resource_type))
         for key, value in resource_type.dict().items():
             setattr(db_resource_type, key, value)
+        if (_filterable_fields(db_resource_type), _searchable_fields(db_resource_type)) != indexed:
+            reindex_resource_entries(db, resource_type_id)
         db.commit()
-        db.refresh(db_resource_type)
+        response_cache.invalidate("resource_types")
     return db_resource_type
 
 def delete_resource_type(db: Session, resource_type_id: int) -> bool:
     db_resource_type = get_resource_type(db, resource_type_id)
     if db_resource_type:
+        db.query(ResourceEntryIndex).filter(
+            ResourceEntryIndex.resource_type_id == resource_type_id
+        ).delete(synchronize_session=False)
+        search.clear(db, search.RESOURCE_ENTRIES, group_id=resource_type_id)
         db.delete(db_resource_type)
         db.commit()
+        response_cache.invalidate("resource_types")
         return True
     return False
 
-def create_resource_entry(db: Session, resource_entry: ResourceEntryCreate) -> ResourceEntry:
+def create_resource_entry(db: Session, resource_entry: ResourceEntryCreate, commit: bool = True) -> ResourceEntry:
     db_resource_entry = ResourceEntry(
         resource_type_id=resource_entry.resource_type_id,
         data=resource_entry.data
     )
     db.add(db_resource_entry)
-    db.commit()
-    db.refresh(db_resource_entry)
+    db.flush()
+    _index_entry(db, db_resource_entry)
+    if commit:
+        db.commit()
     return db_resource_entry
 
 def get_resource_entry(db: Session, entry_id: int) -> Optional[ResourceEntry]:
@@ -70,27 +216,66 @@ def get_resource_entries(
     resource_type_id: int,
     skip: int = 0,
     limit: int = 100,
-    filters: Optional[Dict[str, Any]] = None
-) -> List[ResourceEntry]:
-    query = db.query(ResourceEntry).filter(ResourceEntry.resource_type_id == resource_type_id)
+    filters: Optional[Sequence[str]] = None,
+    after: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None
+) -> List[Any]:
+    """Entries as models, or as dicts of just ``columns`` when given.
+
+    ``filters`` are ``field:op:value`` specs on the type's filterable fields,
+    all of which must match.
+    """
+    query = db.query(ResourceEntry) if columns is None else select_columns(db, ResourceEntry, columns)
+    query = query.filter(ResourceEntry.resource_type_id == resource_type_id)
     
     if filters:
-        for field, value in filters.items():
-            query = query.filter(ResourceEntry.data[field].astext == str(value))
+        filterable = _filterable_fields(
+            db.query(ResourceType).filter(ResourceType.id == resource_type_id).first()
+        )
+        for spec in filters:
+            query = query.filter(_entry_filter(resource_type_id, filterable, spec))
     
-    return query.offset(skip).limit(limit).all()
+    entries = paginate(query, RESOURCE_ENTRY_ORDER, after=after, skip=skip, limit=limit).all()
+    return entries if columns is None else rows_to_dicts(entries)
 
-def update_resource_entry(db: Session, entry_id: int, resource_entry: Dict[str, Any]) -> Optional[ResourceEntry]:
+def search_resource_entries(
+    db: Session,
+    resource_type_id: int,
+    q: str,
+    after: Optional[str] = None,
+    limit: int = 20,
+    order: Tuple = RESOURCE_SEARCH_ORDER
+) -> List[Dict[str, Any]]:
+    """Entries whose searchable fields match ``q``, best first, with their ``rank`` and a ``snippet``."""
+    matches = search.match(db, search.RESOURCE_ENTRIES, q, group_id=resource_type_id)
+    query = db.query(
+        ResourceEntry.id, ResourceEntry.resource_type_id, ResourceEntry.data,
+        ResourceEntry.created_at, ResourceEntry.updated_at, matches.c.rank
+    ).join(matches, matches.c.doc_id == ResourceEntry.id)
+    # Sort keys refer to the match subquery's rank and the entry columns
+    order = tuple((matches.c.rank if key.key == "rank" else key, descending) for key, descending in order)
+    entries = rows_to_dicts(paginate(query, order, after=after, limit=limit).all())
+    found = search.snippets(db, search.RESOURCE_ENTRIES, q, [entry["id"] for entry in entries])
+    for entry in entries:
+        entry["snippet"] = found.get(entry["id"])
+    return entries
+
+def update_resource_entry(db: Session, entry_id: int, resource_entry: Dict[str, Any], commit: bool = True) -> Optional[ResourceEntry]:
     db_resource_entry = get_resource_entry(db, entry_id)
     if db_resource_entry:
         db_resource_entry.data = resource_entry
-        db.commit()
-        db.refresh(db_resource_entry)
+        _index_entry(db, db_resource_entry)
+        if commit:
+            db.commit()
+        else:
+            db.flush()
     return db_resource_entry
 
 def delete_resource_entry(db: Session, entry_id: int) -> bool:
     db_resource_entry = get_resource_entry(db, entry_id)
     if db_resource_entry:
+        db.query(ResourceEntryIndex).filter(ResourceEntryIndex.entry_id == entry_id).delete(synchronize_session=False)
+        search.remove_documents(db, search.RESOURCE_ENTRIES, [entry_id])
         db.delete(db_resource_entry)
         db.commit()
         return True
@@ -1,9 +1,80 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import Optional, List
+from typing import Optional, List, Dict, FrozenSet, Tuple
+from threading import Lock
+import time
 
 from ..models.role import Role, UserRole
 from ..schemas.role import RoleCreate, RoleUpdate, UserRoleCreate
+from ..common.pagination import paginate
+from ..common.assignment import invalidate_role_members
+from ..common import response_cache
+from ..settings import PERMISSION_CACHE_TTL_SECONDS
+
+ROLE_ORDER = ((Role.id, False),)
+
+# Compiled permission sets per user id with the time they were loaded. Entries
+# are dropped whenever role definitions or role assignments change in this
+# process, so steady-state checks cost no queries; PERMISSION_CACHE_TTL_SECONDS
+# bounds how long changes made by other processes go unnoticed.
+_permission_cache: Dict[int, Tuple[FrozenSet[str], float]] = {}
+_role_name_cache: Dict[int, Tuple[FrozenSet[str], float]] = {}
+_permission_cache_lock = Lock()
+_permission_cache_generation = 0
+
+def invalidate_user_permissions(user_id: Optional[int] = None) -> None:
+    global _permission_cache_generation
+    invalidate_role_members()
+    with _permission_cache_lock:
+        _permission_cache_generation += 1
+        if user_id is None:
+            _permission_cache.clear()
+            _role_name_cache.clear()
+        else:
+            _permission_cache.pop(user_id, None)
+            _role_name_cache.pop(user_id, None)
+
+def _cached(cache: Dict[int, Tuple[FrozenSet[str], float]], user_id: int) -> Optional[FrozenSet[str]]:
+    entry = cache.get(user_id)
+    if entry is None or time.monotonic() - entry[1] > PERMISSION_CACHE_TTL_SECONDS:
+        return None
+    return entry[0]
+
+def get_cached_user_permissions(user_id: int) -> Optional[FrozenSet[str]]:
+    return _cached(_permission_cache, user_id)
+
+def get_user_permissions(db: Session, user_id: int) -> FrozenSet[str]:
+    permissions = _cached(_permission_cache, user_id)
+    if permissions is not None:
+        return permissions
+
+    generation = _permission_cache_generation
+    rows = db.query(Role.permissions).join(UserRole, UserRole.role_id == Role.id).filter(
+        UserRole.user_id == user_id
+    ).all()
+    permissions = frozenset(perm for (role_permissions,) in rows for perm in (role_permissions or []))
+
+    with _permission_cache_lock:
+        # Skip caching if an invalidation raced with the query above
+        if generation == _permission_cache_generation:
+            _permission_cache[user_id] = (permissions, time.monotonic())
+    return permissions
+
+def get_user_role_names(db: Session, user_id: int) -> FrozenSet[str]:
+    role_names = _cached(_role_name_cache, user_id)
+    if role_names is not None:
+        return role_names
+
+    generation = _permission_cache_generation
+    rows = db.query(Role.name).join(UserRole, UserRole.role_id == Role.id).filter(
+        UserRole.user_id == user_id
+    ).all()
+    role_names = frozenset(name for (name,) in rows)
+
+    with _permission_cache_lock:
+        if generation == _permission_cache_generation:
+            _role_name_cache[user_id] = (role_names, time.monotonic())
+    return role_names
 
 def get_role(db: Session, role_id: int) -> Optional[Role]:
     return db.query(Role).filter(Role.id == role_id).first()
@@ -11,8 +82,8 @@ def get_role(db: Session, role_id: int) -> Optional[Role]:
 def get_role_by_name(db: Session, name: str) -> Optional[Role]:
     return db.query(Role).filter(Role.name == name).first()
 
-def get_roles(db: Session, skip: int = 0, limit: int = 100) -> List[Role]:
-    return db.query(Role).offset(skip).limit(limit).all()
+def get_roles(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None) -> List[Role]:
+    return paginate(db.query(Role), ROLE_ORDER, after=after, skip=skip, limit=limit).all()
 
 def create_role(db: Session, role: RoleCreate) -> Role:
     db_role = Role(
@@ -23,7 +94,7 @@ def create_role(db: Session, role: RoleCreate) -> Role:
     try:
         db.add(db_role)
         db.commit()
-        db.refresh(db_role)
+        response_cache.invalidate("roles")
         return db_role
     except IntegrityError:
         db.rollback()
@@ -37,7 +108,8 @@ def update_role(db: Session, role_id: int, role: RoleUpdate) -> Role:
     db_role.description = role.description
     db_role.permissions = role.permissions
     db.commit()
-    db.refresh(db_role)
+    invalidate_user_permissions()
+    response_cache.invalidate("roles")
     return db_role
 
 def assign_user_role(db: Session, user_role: UserRoleCreate) -> UserRole:
@@ -49,7 +121,7 @@ def assign_user_role(db: Session, user_role: UserRoleCreate) -> UserRole:
     try:
         db.add(db_user_role)
         db.commit()
-        db.refresh(db_user_role)
+        invalidate_user_permissions(db_user_role.user_id)
         return db_user_role
     except IntegrityError:
         db.rollback()
@@ -58,10 +130,12 @@ def assign_user_role(db: Session, user_role: UserRoleCreate) -> UserRole:
 def get_user_roles(db: Session, user_id: int) -> List[UserRole]:
     return db.query(UserRole).filter(UserRole.user_id == user_id).all()
 
-def delete_user_roles(db: Session, user_id: int) -> None:
-    user_roles = db.query(UserRole).filter(UserRole.user_id == user_id)
-    user_roles.delete()
+def delete_user_roles(db: Session, user_id: int) -> List[UserRole]:
+    user_roles = db.query(UserRole).filter(UserRole.user_id == user_id).all()
+    for user_role in user_roles:
+        db.delete(user_role)
     db.commit()
+    invalidate_user_permissions(user_id)
     return user_roles
 
 def get_role_users(db: Session, role_id: int) -> List[UserRole]:
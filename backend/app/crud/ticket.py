@@ -1,103 +1,822 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional, Dict, Any
+from sqlalchemy import and_, column, func, insert, or_, select, union_all
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.orm.exc import StaleDataError
+from typing import List, Optional, Dict, Any, Sequence, Set, Tuple
 from datetime import datetime
 
 from ..models.ticket import Ticket
-from ..models.ticket_template import TicketTemplate
-from ..schemas.ticket import TicketCreate, TicketUpdate
+from ..models.ticket_archive import TicketArchive
+from ..models.ticket_template import TicketTemplate, TicketTemplateVersion
+from ..models.ticket_step import TicketStep
+from ..models.ticket_event import TicketEvent
+from ..schemas.ticket import TicketCreate, TicketUpdate, TicketFilter, with_form_definitions
 from ..schemas.ticket_template import WorkflowStep
+from ..common.pagination import nulls_as, paginate
+from ..common.fieldsets import select_columns, rows_to_dicts
+from ..common.jsonpatch import PatchError, apply_patch, apply_merge_patch
+from ..common import assignment, search
+from .ticket_template import create_template_version, load_template_versions
+from ..common.workflow import (
+    StepStateError, WorkflowError, get_compiled_workflow, get_compiled_version, unblocked_steps, validate_form,
+    get_cached_template_skeleton, cache_template_skeleton
+)
 
-def get_step_assignee(workflow_steps: List[WorkflowStep], status: str) -> Optional[int]:
+# Newest first; id breaks ties between tickets created in the same instant
+TICKET_ORDER = ((Ticket.created_at, True), (Ticket.id, True))
+TASK_ORDER = ((TicketStep.ticket_id, True), (TicketStep.id, True))
+EVENT_ORDER = ((TicketEvent.timestamp, False), (TicketEvent.id, False))
+TICKET_SORT_FIELDS = ("created_at", "updated_at", "priority", "status", "title", "id")
+# Sort fields that may be NULL; created_at and updated_at are always set by their column defaults
+TICKET_NULLABLE_SORT_FIELDS = ("priority", "status", "title")
+# Ticket fields the search documents are built from
+SEARCHED_FIELDS = {"title", "description", "workflow_data"}
+# Best match first; "rank" is the search rank column of search_tickets
+TICKET_SEARCH_ORDER = ((column("rank"), False), (Ticket.id, False))
+# Left out of ticket lists unless requested with ?fields=
+TICKET_DEFERRED_FIELDS = ("workflow_data",)
+# The document JSON Patch paths are resolved against
+PATCHABLE_FIELDS = ("title", "description", "status", "priority", "workflow_data")
+# Tickets in these statuses are moved to tickets_archive once they stop changing
+ARCHIVE_STATUSES = ("completed", "closed")
+# Columns copied between tickets and tickets_archive
+TICKET_COLUMNS = tuple(column.key for column in Ticket.__table__.columns)
+
+class VersionConflict(ValueError):
+    """The ticket changed after the version the update was based on."""
+
+def get_ticket_order(sort: Optional[str] = None, source: Any = Ticket) -> Tuple:
+    """Parse a sort spec like ``-created_at,priority`` into a keyset order.
+
+    ``source`` is anything exposing ticket columns as attributes: the model, or
+    the ``.c`` collection of a table or subquery with the same columns.
+    """
+    if not sort:
+        return ((source.created_at, True), (source.id, True))
+    order, names = [], []
+    for key in sort.split(","):
+        key = key.strip()
+        name = key.lstrip("+-")
+        if name not in TICKET_SORT_FIELDS:
+            raise ValueError(f"Cannot sort tickets by '{name}'")
+        if name in names:
+            continue
+        names.append(name)
+        order.append((_sort_key(source, name), key.startswith("-")))
+    if "id" not in names:
+        # Unique tie-breaker so cursors are stable
+        order.append((source.id, order[0][1]))
+    return tuple(order)
+
+def _sort_key(source: Any, name: str) -> Any:
+    column = getattr(source, name)
+    return nulls_as(column, "") if name in TICKET_NULLABLE_SORT_FIELDS else column
+
+def filter_tickets(query, filters: Optional[TicketFilter], source: Any = Ticket):
+    if not filters:
+        return query
+    if filters.status:
+        query = query.filter(source.status.in_(filters.status))
+    if filters.priority:
+        query = query.filter(source.priority.in_(filters.priority))
+    if filters.template_id:
+        query = query.filter(source.template_id.in_(filters.template_id))
+    if filters.created_by:
+        query = query.filter(source.created_by.in_(filters.created_by))
+    if filters.created_after:
+        query = query.filter(source.created_at >= filters.created_after)
+    if filters.created_before:
+        query = query.filter(source.created_at < filters.created_before)
+    if filters.updated_after:
+        query = query.filter(source.updated_at >= filters.updated_after)
+    if filters.updated_before:
+        query = query.filter(source.updated_at < filters.updated_before)
+    return query
+
+def get_step_assignee(db: Session, workflow_steps: List[WorkflowStep], step_id: str) -> Optional[int]:
     if not workflow_steps:
         return None
     
     for step in workflow_steps:
-        if step['id'] == status:
-            # Here we would implement the logic to resolve the assignee based on
-            # the assignable_roles. For now, we'll return None
-            # as this would require additional role/user resolution logic
-            return None
+        if step['id'] == step_id:
+            return assignment.pick_assignee(db, step.get('assignable_roles') or [])
     return None
 
-def create_ticket(db: Session, ticket: TicketCreate, user_id: int) -> Ticket:
-    template = db.query(TicketTemplate).filter(TicketTemplate.id == ticket.template_id).first()
+def assign_open_steps(db: Session, workflow_data: Dict[str, Any], template: Optional[TicketTemplate]) -> None:
+    """Fill in assignees for unassigned in-progress steps when the template auto-assigns."""
+    if not template or not (template.workflow_config or {}).get("auto_assignment"):
+        return
+    for step_id, step_data in (workflow_data.get("steps") or {}).items():
+        if step_data.get("status") == "in_progress" and step_data.get("assignee_id") is None:
+            step_data["assignee_id"] = get_step_assignee(db, template.workflow, step_id)
+
+def get_template_skeleton(db: Session, template_id: int):
+    skeleton = get_cached_template_skeleton(template_id)
+    if skeleton is None:
+        template = db.query(TicketTemplate).filter(TicketTemplate.id == template_id).first()
+        if not template:
+            return None
+        if template.current_version_id is None:
+            # Template predates versioning; snapshot it now. Not cached until
+            # committed, since a rollback would discard the version row
+            version = create_template_version(db, template)
+            return cache_template_skeleton(template, version, cache=False)
+        version = db.query(TicketTemplateVersion).filter(TicketTemplateVersion.id == template.current_version_id).first()
+        skeleton = cache_template_skeleton(template, version)
+    return skeleton
+
+def _strip_form_definitions(workflow_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Forms are resolved from the ticket's template version, not stored per ticket
+    metadata = workflow_data.get("metadata")
+    if not metadata or "form_definitions" not in metadata:
+        return workflow_data
+    metadata = {key: value for key, value in metadata.items() if key != "form_definitions"}
+    return {**workflow_data, "metadata": metadata}
+
+def _event(
+    step_id: Optional[str],
+    type: str,
+    from_status: Optional[str] = None,
+    to_status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    content: Optional[str] = None,
+    timestamp: Any = None
+) -> Dict[str, Any]:
+    return {
+        "step_id": step_id,
+        "type": type,
+        "from_status": from_status,
+        "to_status": to_status,
+        "user_id": user_id,
+        "content": content,
+        "timestamp": _parse_timestamp(timestamp) or datetime.utcnow(),
+    }
+
+def _take_history(steps: Dict[str, Any], previous_steps: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Remove the ``history`` arrays from ``steps`` and return them as event rows.
+
+    Tickets written before ticket_events existed still carry history in their
+    stored steps; ``previous_steps`` holds those, so they move over once and a
+    client echoing them back doesn't duplicate them.
+    """
+    events = []
+    for step_id, step_data in list(steps.items()):
+        if not isinstance(step_data, dict):
+            continue
+        previous = ((previous_steps or {}).get(step_id) or {}).get("history") or []
+        history = previous + [entry for entry in step_data.get("history") or [] if entry not in previous]
+        if "history" in step_data:
+            steps[step_id] = {key: value for key, value in step_data.items() if key != "history"}
+        for entry in history:
+            events.append(_event(
+                step_id,
+                entry.get("type") or "status_change",
+                entry.get("from", entry.get("from_status")),
+                entry.get("to", entry.get("to_status")),
+                entry.get("user_id"),
+                entry.get("content"),
+                entry.get("timestamp")
+            ))
+    return events
+
+def _insert_events(db: Session, ticket_id: int, events: List[Dict[str, Any]]) -> None:
+    if events:
+        db.execute(insert(TicketEvent), [{**event, "ticket_id": ticket_id} for event in events])
+
+def get_ticket_events(
+    db: Session,
+    ticket_id: int,
+    step_id: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 100
+) -> Optional[List[TicketEvent]]:
+    """A page of the ticket's events, oldest first; None if the ticket doesn't exist."""
+    if (
+        db.query(Ticket.id).filter(Ticket.id == ticket_id).first() is None
+        and db.query(TicketArchive.id).filter(TicketArchive.id == ticket_id).first() is None
+    ):
+        return None
+    query = db.query(TicketEvent).filter(TicketEvent.ticket_id == ticket_id)
+    if step_id is not None:
+        query = query.filter(TicketEvent.step_id == step_id)
+    return paginate(query, EVENT_ORDER, after=after, limit=limit).all()
+
+def _search_document(ticket: Any) -> Dict[str, Any]:
+    steps = (ticket.workflow_data or {}).get("steps") or {}
+    form_values = [
+        value for step_data in steps.values() if isinstance(step_data, dict)
+        for value in (step_data.get("form_data") or {}).values()
+    ]
+    return {
+        "doc_id": ticket.id,
+        "title": ticket.title or "",
+        "description": ticket.description or "",
+        "form_text": search.document_text(form_values),
+    }
+
+def _index_tickets(db: Session, tickets: List[Any]) -> None:
+    search.index_documents(db, search.TICKETS, [_search_document(ticket) for ticket in tickets])
+
+def reindex_ticket_search(db: Session, batch_size: int = 500) -> int:
+    """Rebuild the search documents of all tickets, archived ones included; commits per batch."""
+    search.clear(db, search.TICKETS)
+    total = 0
+    for model in (Ticket, TicketArchive):
+        last_id = 0
+        while True:
+            tickets = db.query(model).filter(model.id > last_id).order_by(model.id).limit(batch_size).all()
+            if not tickets:
+                break
+            _index_tickets(db, tickets)
+            db.commit()
+            db.expunge_all()
+            last_id = tickets[-1].id
+            total += len(tickets)
+    search.optimize(db, search.TICKETS)
+    db.commit()
+    return total
+
+def load_ticket_forms(db: Session, tickets: List[Ticket]) -> List[Ticket]:
+    """Warm the version cache used to fill in form definitions when tickets are serialized."""
+    load_template_versions(db, (ticket.template_version_id for ticket in tickets))
+    return tickets
+
+def _new_ticket(db: Session, ticket: TicketCreate, user_id: int):
+    """Build an unsaved ticket with its initial workflow data, and the template skeleton it used."""
+    template = get_template_skeleton(db, ticket.template_id)
     if not template:
         raise ValueError("Invalid template reference")
 
     # Initialize workflow data if not provided
-    if not ticket.workflow_data:
+    events = []
+    if ticket.workflow_data:
+        workflow_data = _strip_form_definitions(ticket.workflow_data.model_dump(mode='json'))
+        workflow_data["metadata"].update(template_version=str(template.version), template_version_id=template.version_id)
+        events = _take_history(workflow_data["steps"])
+    else:
         current_time = datetime.utcnow().isoformat()
-        ticket.workflow_data = {
+        # Steps with no dependencies start right away
+        steps = {}
+        for step_id in template.step_ids:
+            if step_id in template.roots:
+                steps[step_id] = {
+                    "status": "in_progress",
+                    "assignee_id": None,
+                    "started_at": current_time,
+                    "form_data": {}
+                }
+                events.append(_event(step_id, "status_change", "pending", "in_progress", timestamp=current_time))
+            else:
+                steps[step_id] = {
+                    "status": "pending",
+                    "assignee_id": None,
+                    "started_at": None,
+                    "form_data": {}
+                }
+        workflow_data = {
             "metadata": {
-                "template_version": "1.0.0",
+                "template_version": str(template.version),
+                "template_version_id": template.version_id,
                 "created_at": current_time,
-                "workflow_config": template.workflow_config or {
-                    "parallel_execution": False,
-                    "auto_assignment": False,
-                    "notification_rules": []
-                },
-                "form_definitions": {}
+                "workflow_config": template.workflow_config
             },
-            "steps": {}
+            "steps": steps
         }
 
-        # Initialize steps from template workflow
-        for i, step in enumerate(template.workflow or []):
-            ticket.workflow_data["metadata"]["form_definitions"][step["id"]] = step.get("form", [])
-            ticket.workflow_data["steps"][step["id"]] = {
-                "status": "in_progress" if i == 0 else "pending",
-                "assignee_id": None,
-                "started_at": current_time if i == 0 else None,
-                "form_data": {},
-                "history": [{
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "type": "status_change",
-                    "from": "pending",
-                    "to": "in_progress"
-                }] if i == 0 else []
-            }
-
+    assign_open_steps(db, workflow_data, template)
     db_ticket = Ticket(
         title=ticket.title or template.title_format,
         description=ticket.description,
         priority=ticket.priority or template.default_priority,
         status="opened",
         template_id=ticket.template_id,
+        template_version_id=template.version_id,
         created_by=user_id,
-        workflow_data=ticket.workflow_data.model_dump(mode='json') if ticket.workflow_data else None
+        workflow_data=workflow_data
     )
+    return db_ticket, template, events
+
+def create_ticket(db: Session, ticket: TicketCreate, user_id: int, commit: bool = True) -> Ticket:
+    db_ticket, template, events = _new_ticket(db, ticket, user_id)
     db.add(db_ticket)
-    db.commit()
-    db.refresh(db_ticket)
+    db.flush()
+    sync_ticket_steps(db, db_ticket, template, created=True)
+    _insert_events(db, db_ticket.id, events)
+    _index_tickets(db, [db_ticket])
+    load_ticket_forms(db, [db_ticket])
+    if commit:
+        db.commit()
     return db_ticket
 
-def get_tickets(db: Session, skip: int = 0, limit: int = 100) -> List[Ticket]:
-    return db.query(Ticket).order_by(desc(Ticket.created_at)).offset(skip).limit(limit).all()
+def create_tickets(db: Session, tickets: List[TicketCreate], user_id: int) -> List[Tuple[Optional[Ticket], Optional[str]]]:
+    """Create many tickets in one transaction with batched inserts.
+
+    Returns a (ticket, error) pair per input; items that fail validation are
+    skipped without affecting the rest.
+    """
+    results, created = [], []
+    for ticket in tickets:
+        try:
+            db_ticket, template, events = _new_ticket(db, ticket, user_id)
+        except ValueError as e:
+            results.append((None, str(e)))
+            continue
+        results.append((db_ticket, None))
+        created.append((db_ticket, template, events))
+
+    db.add_all([db_ticket for db_ticket, _, _ in created])
+    db.flush()
+    rows = [row for db_ticket, template, _ in created for row in _step_rows(db_ticket, template)]
+    if rows:
+        db.execute(insert(TicketStep), rows)
+    event_rows = [{**event, "ticket_id": db_ticket.id} for db_ticket, _, events in created for event in events]
+    if event_rows:
+        db.execute(insert(TicketEvent), event_rows)
+    assignment.adjust_open_work([], [
+        assignee_id for db_ticket, _, _ in created for _, assignee_id in _open_assignments(db_ticket.workflow_data["steps"])
+    ], db)
+    _index_tickets(db, [db_ticket for db_ticket, _, _ in created])
+    db.commit()
+    return results
+
+def get_tickets(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    filters: Optional[TicketFilter] = None,
+    order: Tuple = TICKET_ORDER,
+    columns: Optional[Sequence[str]] = None
+) -> List[Any]:
+    """Tickets as models, or as dicts of just ``columns`` when given.
+
+    With ``filters.include_archived``, tickets_archive is searched as well and
+    dicts are always returned.
+    """
+    include_archived = filters is not None and filters.include_archived
+    if columns is None and not include_archived:
+        query = filter_tickets(db.query(Ticket), filters)
+        return load_ticket_forms(db, paginate(query, order, after=after, skip=skip, limit=limit).all())
+
+    columns = _with_form_columns(columns or TICKET_COLUMNS)
+    if include_archived:
+        source = _with_archived(columns)
+        order = tuple((_sort_key(source, column.key), descending) for column, descending in order)
+        query = filter_tickets(db.query(*[source[name] for name in columns]), filters, source=source)
+    else:
+        query = filter_tickets(select_columns(db, Ticket, columns), filters)
+    tickets = rows_to_dicts(paginate(query, order, after=after, skip=skip, limit=limit).all())
+    return _fill_forms(db, tickets)
+
+def _with_form_columns(columns: Sequence[str]) -> Sequence[str]:
+    if "workflow_data" in columns and "template_version_id" not in columns:
+        # Needed to fill in the forms of the ticket's template version
+        return (*columns, "template_version_id")
+    return columns
+
+def _with_archived(columns: Sequence[str]) -> Any:
+    """Columns of tickets UNION ALL tickets_archive, usable as a ``source`` for filters and sorting."""
+    # Filters and sort keys may use any column; only read workflow_data when it's returned
+    names = [name for name in TICKET_COLUMNS if name != "workflow_data" or name in columns]
+    return union_all(
+        select(*[Ticket.__table__.c[name] for name in names]),
+        select(*[TicketArchive.__table__.c[name] for name in names])
+    ).subquery().c
+
+def _fill_forms(db: Session, tickets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if tickets and "workflow_data" in tickets[0]:
+        load_template_versions(db, (ticket["template_version_id"] for ticket in tickets))
+        for ticket in tickets:
+            ticket["workflow_data"] = with_form_definitions(ticket["workflow_data"], ticket["template_version_id"])
+    return tickets
+
+def search_tickets(
+    db: Session,
+    q: str,
+    filters: Optional[TicketFilter] = None,
+    after: Optional[str] = None,
+    limit: int = 20,
+    order: Tuple = TICKET_SEARCH_ORDER,
+    columns: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """Tickets whose title, description or step form data match ``q``, best first.
+
+    Returns dicts of ``columns`` with the ticket's ``rank`` and a ``snippet``.
+    ``filters`` narrow the matches as in ``get_tickets``, including
+    ``include_archived``.
+    """
+    matches = search.match(db, search.TICKETS, q)
+    columns = _with_form_columns(columns or TICKET_COLUMNS)
+    source = _with_archived(columns) if filters is not None and filters.include_archived else Ticket
+    query = db.query(*[getattr(source, name) for name in columns], matches.c.rank).join(
+        matches, matches.c.doc_id == source.id
+    )
+    # Sort keys refer to the match subquery's rank and the ticket columns
+    order = tuple((matches.c.rank if key.key == "rank" else _sort_key(source, key.key), descending) for key, descending in order)
+    query = filter_tickets(query, filters, source=source)
+    tickets = _fill_forms(db, rows_to_dicts(paginate(query, order, after=after, limit=limit).all()))
+    found = search.snippets(db, search.TICKETS, q, [ticket["id"] for ticket in tickets])
+    for ticket in tickets:
+        ticket["snippet"] = found.get(ticket["id"])
+    return tickets
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime) or value is None:
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def _open_assignments(steps: Dict[str, Dict[str, Any]]) -> Set[Tuple[str, int]]:
+    return {
+        (step_id, step_data["assignee_id"]) for step_id, step_data in steps.items()
+        if step_data.get("status") == "in_progress" and step_data.get("assignee_id") is not None
+    }
+
+def _step_rows(ticket: Ticket, template: Any) -> List[Dict[str, Any]]:
+    roles_by_step = {step["id"]: step.get("assignable_roles") or [] for step in (template.workflow or [])} if template else {}
+    rows = []
+    for step_id, step_data in ((ticket.workflow_data or {}).get("steps") or {}).items():
+        for role in roles_by_step.get(step_id) or [None]:
+            rows.append({
+                "ticket_id": ticket.id,
+                "step_id": step_id,
+                "status": step_data.get("status") or "pending",
+                "assignee_id": step_data.get("assignee_id"),
+                "role": role,
+                "started_at": _parse_timestamp(step_data.get("started_at")),
+            })
+    return rows
+
+def sync_ticket_steps(db: Session, ticket: Ticket, template: Optional[TicketTemplate] = None, created: bool = False) -> None:
+    """Rewrite the ticket's ``ticket_steps`` rows from its workflow data.
+
+    Runs in the caller's transaction, so the rows commit together with the ticket.
+    """
+    if template is None:
+        template = db.query(TicketTemplate).filter(TicketTemplate.id == ticket.template_id).first()
+    rows = _step_rows(ticket, template)
+
+    previous = set()
+    if not created:
+        previous = set(db.query(TicketStep.step_id, TicketStep.assignee_id).filter(
+            TicketStep.ticket_id == ticket.id,
+            TicketStep.status == "in_progress",
+            TicketStep.assignee_id.isnot(None)
+        ).distinct().all())
+    current = _open_assignments((ticket.workflow_data or {}).get("steps") or {})
+    assignment.adjust_open_work(
+        [user_id for _, user_id in previous - current],
+        [user_id for _, user_id in current - previous],
+        db
+    )
+
+    if not created:
+        db.query(TicketStep).filter(TicketStep.ticket_id == ticket.id).delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(TicketStep), rows)
+
+def get_user_tasks(
+    db: Session,
+    user_id: int,
+    role_names: List[str],
+    status: str = "in_progress",
+    after: Optional[str] = None,
+    limit: int = 100
+) -> List[TicketStep]:
+    """Steps in ``status`` assigned to the user, or unassigned and open to one of their roles."""
+    assigned = or_(
+        TicketStep.assignee_id == user_id,
+        and_(TicketStep.assignee_id.is_(None), TicketStep.role.in_(role_names))
+    )
+    # A step open to several of the user's roles has one row per role; keep one
+    task_ids = db.query(func.min(TicketStep.id)).join(Ticket, Ticket.id == TicketStep.ticket_id).filter(
+        TicketStep.status == status,
+        assigned,
+        Ticket.status.notin_(("completed", "closed"))
+    ).group_by(TicketStep.ticket_id, TicketStep.step_id)
+    query = db.query(TicketStep).options(joinedload(TicketStep.ticket)).filter(TicketStep.id.in_(task_ids))
+    tasks = paginate(query, TASK_ORDER, after=after, limit=limit).all()
+    load_ticket_forms(db, [task.ticket for task in tasks])
+    return tasks
 
 def get_ticket(db: Session, ticket_id: int) -> Optional[Ticket]:
-    return db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    """The ticket, or its ``TicketArchive`` row if it was archived."""
+    db_ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    if db_ticket is None:
+        db_ticket = db.query(TicketArchive).filter(TicketArchive.id == ticket_id).first()
+    if db_ticket:
+        load_ticket_forms(db, [db_ticket])
+    return db_ticket
+
+def archive_tickets(db: Session, updated_before: datetime, limit: int = 500) -> int:
+    """Move up to ``limit`` closed tickets last updated before ``updated_before`` to tickets_archive.
+
+    Their ticket_steps rows are dropped; ticket_events stay. Returns the number moved.
+    """
+    archivable = and_(Ticket.status.in_(ARCHIVE_STATUSES), Ticket.updated_at < updated_before)
+    # SQLite tables created without AUTOINCREMENT hand out max(id) + 1, so the
+    # newest ticket stays put to keep archived ids from being reused
+    newest_id = db.query(func.max(Ticket.id)).scalar_subquery()
+    ticket_ids = [
+        ticket_id for (ticket_id,) in db.query(Ticket.id).filter(archivable, Ticket.id < newest_id)
+        .order_by(Ticket.id).limit(limit).with_for_update(skip_locked=True)
+    ]
+    if not ticket_ids:
+        return 0
+
+    open_steps = db.query(TicketStep.assignee_id, TicketStep.ticket_id, TicketStep.step_id).filter(
+        TicketStep.ticket_id.in_(ticket_ids),
+        TicketStep.status == "in_progress",
+        TicketStep.assignee_id.isnot(None)
+    ).distinct().all()
+    tickets = Ticket.__table__
+    db.execute(insert(TicketArchive.__table__).from_select(
+        TICKET_COLUMNS,
+        select(*[tickets.c[name] for name in TICKET_COLUMNS]).where(tickets.c.id.in_(ticket_ids))
+    ))
+    db.query(TicketStep).filter(TicketStep.ticket_id.in_(ticket_ids)).delete(synchronize_session=False)
+    archived = db.query(Ticket).filter(Ticket.id.in_(ticket_ids)).delete(synchronize_session=False)
+    db.commit()
+    assignment.adjust_open_work([user_id for user_id, _, _ in open_steps], [])
+    return archived
+
+def _restore_archived(db: Session, ticket_ids: Sequence[int]) -> None:
+    """Move archived tickets back into ``tickets`` before they are written to."""
+    archived_ids = [
+        ticket_id for (ticket_id,) in db.query(TicketArchive.id).filter(TicketArchive.id.in_(ticket_ids))
+    ]
+    if not archived_ids:
+        return
+    archive = TicketArchive.__table__
+    db.execute(insert(Ticket.__table__).from_select(
+        TICKET_COLUMNS,
+        select(*[archive.c[name] for name in TICKET_COLUMNS]).where(archive.c.id.in_(archived_ids))
+    ))
+    db.query(TicketArchive).filter(TicketArchive.id.in_(archived_ids)).delete(synchronize_session=False)
+    # Archiving removed the step rows, so this counts the open steps again
+    for db_ticket in db.query(Ticket).filter(Ticket.id.in_(archived_ids)):
+        sync_ticket_steps(db, db_ticket)
+
+def _check_version(db_ticket: Ticket, expected_versions: Optional[Set[int]]) -> None:
+    if expected_versions is not None and db_ticket.version not in expected_versions:
+        raise VersionConflict(f"Ticket {db_ticket.id} is at version {db_ticket.version}")
 
-def update_ticket(db: Session, ticket_id: int, ticket_update: TicketUpdate) -> Optional[Ticket]:
+def _commit_versioned(db: Session) -> None:
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise VersionConflict("Ticket was modified concurrently")
+
+def update_ticket(
+    db: Session,
+    ticket_id: int,
+    ticket_update: TicketUpdate,
+    expected_versions: Optional[Set[int]] = None
+) -> Optional[Ticket]:
+    _restore_archived(db, [ticket_id])
     db_ticket = get_ticket(db, ticket_id)
     if not db_ticket:
         return None
+    _check_version(db_ticket, expected_versions)
     
     update_data = ticket_update.model_dump(exclude_unset=True)
-    
-    # If status is being updated, update the assignee based on the template's workflow
-    if 'status' in update_data:
+
+    template = None
+    events = []
+    if update_data.get('workflow_data') and db_ticket.template_version_id:
+        update_data['workflow_data'] = _strip_form_definitions(update_data['workflow_data'])
+    if update_data.get('workflow_data'):
+        steps = update_data['workflow_data'].get('steps')
+        if isinstance(steps, dict):
+            events = _take_history(steps, (db_ticket.workflow_data or {}).get('steps'))
+        # Assign steps the update moved into progress
         template = db.query(TicketTemplate).filter(TicketTemplate.id == db_ticket.template_id).first()
-        if template:
-            new_assignee = get_step_assignee(template.workflow, update_data['status'])
-            if new_assignee is not None:
-                update_data['assigned_to'] = new_assignee
+        assign_open_steps(db, update_data['workflow_data'], template)
     
     for field, value in update_data.items():
         setattr(db_ticket, field, value)
-    
-    db.commit()
-    db.refresh(db_ticket)
+
+    if 'workflow_data' in update_data:
+        sync_ticket_steps(db, db_ticket, template)
+    if update_data.keys() & SEARCHED_FIELDS:
+        _index_tickets(db, [db_ticket])
+    _insert_events(db, ticket_id, events)
+    _commit_versioned(db)
+    return db_ticket
+
+def patch_ticket(
+    db: Session,
+    ticket_id: int,
+    patch: Any,
+    merge: bool = False,
+    expected_versions: Optional[Set[int]] = None
+) -> Optional[Ticket]:
+    """Apply a JSON Patch, or with ``merge`` a JSON Merge Patch, to a ticket.
+
+    Paths address ``PATCHABLE_FIELDS``, e.g. ``/workflow_data/steps/review/assignee_id``.
+    Only fields the patch changes are written, and only the steps it changes get
+    their ``ticket_steps`` rows updated. ``expected_versions`` comes from If-Match.
+    """
+    _restore_archived(db, [ticket_id])
+    db_ticket = db.query(Ticket).filter(Ticket.id == ticket_id).with_for_update().first()
+    if not db_ticket:
+        return None
+    _check_version(db_ticket, expected_versions)
+
+    document = {field: getattr(db_ticket, field) for field in PATCHABLE_FIELDS}
+    patched = apply_merge_patch(document, patch) if merge else apply_patch(document, patch)
+    if not isinstance(patched, dict) or set(patched) - set(PATCHABLE_FIELDS):
+        raise PatchError(f"Only {', '.join(PATCHABLE_FIELDS)} can be patched")
+    changes = {
+        field: patched.get(field) for field in PATCHABLE_FIELDS
+        if patched.get(field) != document[field]
+    }
+    # Type-check the changed fields the same way a PUT would
+    changes = TicketUpdate(**changes).model_dump(include=set(changes))
+
+    old_steps = (document["workflow_data"] or {}).get("steps") or {}
+    template = None
+    events = []
+    if changes.get("workflow_data"):
+        if db_ticket.template_version_id:
+            changes["workflow_data"] = _strip_form_definitions(changes["workflow_data"])
+        new_steps = changes["workflow_data"].get("steps") or {}
+        if not isinstance(new_steps, dict) or not all(isinstance(step_data, dict) for step_data in new_steps.values()):
+            raise PatchError("Workflow steps must be objects keyed by step id")
+        # Unchanged steps are shared with the stored document; copy before assigning
+        changes["workflow_data"] = {**changes["workflow_data"], "steps": {step_id: dict(step_data) for step_id, step_data in new_steps.items()}}
+        events = _take_history(changes["workflow_data"]["steps"], old_steps)
+        template = db.query(TicketTemplate).filter(TicketTemplate.id == db_ticket.template_id).first()
+        assign_open_steps(db, changes["workflow_data"], template)
+
+    for field, value in changes.items():
+        setattr(db_ticket, field, value)
+
+    released, assigned = [], []
+    if "workflow_data" in changes:
+        new_steps = (db_ticket.workflow_data or {}).get("steps") or {}
+        if set(new_steps) == set(old_steps):
+            touched = [step_id for step_id in new_steps if new_steps[step_id] != old_steps[step_id]]
+            _update_step_rows(db, ticket_id, new_steps, touched)
+            previous, current = _open_assignments(old_steps), _open_assignments(new_steps)
+            released = [user_id for _, user_id in previous - current]
+            assigned = [user_id for _, user_id in current - previous]
+        else:
+            # Steps were added or removed, so rebuild the rows
+            sync_ticket_steps(db, db_ticket, template)
+    assignment.adjust_open_work(released, assigned, db)
+    if changes.keys() & SEARCHED_FIELDS:
+        _index_tickets(db, [db_ticket])
+    _insert_events(db, ticket_id, events)
+    _commit_versioned(db)
+    load_ticket_forms(db, [db_ticket])
+    return db_ticket
+
+def bulk_update_tickets(
+    db: Session,
+    ticket_ids: List[int],
+    changes: Dict[str, Any]
+) -> List[Tuple[int, Optional[str]]]:
+    """Apply the same status, priority and/or step assignee change to many tickets.
+
+    ``changes`` may hold ``status``, ``priority`` and ``assignee_id``; an
+    assignee change applies to the in-progress steps of each ticket. Everything
+    is written in one transaction, so a concurrent change to any of the tickets
+    fails the batch with ``VersionConflict``. Returns an (id, error) pair per
+    requested id.
+    """
+    ticket_ids = list(dict.fromkeys(ticket_ids))
+    _restore_archived(db, ticket_ids)
+    tickets = {
+        db_ticket.id: db_ticket
+        for db_ticket in db.query(Ticket).filter(Ticket.id.in_(ticket_ids)).with_for_update()
+    }
+
+    released, assigned, reassigned_ids = [], [], []
+    for db_ticket in tickets.values():
+        for field in ("status", "priority"):
+            if field in changes:
+                setattr(db_ticket, field, changes[field])
+        if "assignee_id" not in changes:
+            continue
+        steps = dict((db_ticket.workflow_data or {}).get("steps") or {})
+        if not steps:
+            continue
+        for step_id, step_data in steps.items():
+            if step_data.get("status") != "in_progress" or step_data.get("assignee_id") == changes["assignee_id"]:
+                continue
+            if step_data.get("assignee_id") is not None:
+                released.append(step_data["assignee_id"])
+            if changes["assignee_id"] is not None:
+                assigned.append(changes["assignee_id"])
+            steps[step_id] = {**step_data, "assignee_id": changes["assignee_id"]}
+        db_ticket.workflow_data = {**db_ticket.workflow_data, "steps": steps}
+        reassigned_ids.append(db_ticket.id)
+
+    if reassigned_ids:
+        db.query(TicketStep).filter(
+            TicketStep.ticket_id.in_(reassigned_ids),
+            TicketStep.status == "in_progress"
+        ).update({TicketStep.assignee_id: changes["assignee_id"]}, synchronize_session=False)
+    assignment.adjust_open_work(released, assigned, db)
+    _commit_versioned(db)
+    return [(ticket_id, None if ticket_id in tickets else "Ticket not found") for ticket_id in ticket_ids]
+
+def _update_step_rows(db: Session, ticket_id: int, steps: Dict[str, Dict[str, Any]], step_ids: List[str]) -> None:
+    for step_id in step_ids:
+        step_data = steps[step_id]
+        db.query(TicketStep).filter(
+            TicketStep.ticket_id == ticket_id,
+            TicketStep.step_id == step_id
+        ).update({
+            TicketStep.status: step_data.get("status") or "pending",
+            TicketStep.assignee_id: step_data.get("assignee_id"),
+            TicketStep.started_at: _parse_timestamp(step_data.get("started_at")),
+        }, synchronize_session=False)
+
+def complete_ticket_step(
+    db: Session,
+    ticket_id: int,
+    step_id: str,
+    form_data: Dict[str, Any],
+    user_id: int
+) -> Optional[Ticket]:
+    """Complete an in-progress step and start the steps it unblocks.
+
+    The ticket row is locked for the transaction, so concurrent completions of
+    sibling steps cannot both miss that a joint dependent became ready.
+    """
+    _restore_archived(db, [ticket_id])
+    db_ticket = db.query(Ticket).filter(Ticket.id == ticket_id).with_for_update().first()
+    if not db_ticket:
+        return None
+    # Run the ticket against the template version it was created from
+    template = None
+    if db_ticket.template_version_id:
+        template = db.query(TicketTemplateVersion).filter(TicketTemplateVersion.id == db_ticket.template_version_id).first()
+    if template:
+        compiled = get_compiled_version(template)
+        forms = template.form_definitions or {}
+    else:
+        template = db.query(TicketTemplate).filter(TicketTemplate.id == db_ticket.template_id).first()
+        if not template:
+            raise WorkflowError("Ticket template no longer exists")
+        compiled = get_compiled_workflow(template)
+        forms = ((db_ticket.workflow_data or {}).get("metadata") or {}).get("form_definitions") or {}
+    if step_id not in compiled.steps:
+        raise WorkflowError(f"Unknown workflow step '{step_id}'")
+
+    workflow_data = db_ticket.workflow_data or {}
+    steps = workflow_data.setdefault("steps", {})
+    step_data = steps.get(step_id) or {}
+    if step_data.get("status") != "in_progress":
+        raise StepStateError(f"Step '{step_id}' is {step_data.get('status') or 'not started'}, not in progress")
+
+    merged_form_data = {**(step_data.get("form_data") or {}), **form_data}
+    errors = validate_form(forms.get(step_id, compiled.steps[step_id].get("form")), merged_form_data)
+    if errors:
+        raise WorkflowError("; ".join(errors))
+
+    now = datetime.utcnow().isoformat()
+    released = [step_data["assignee_id"]] if step_data.get("assignee_id") is not None else []
+    # Move any history still stored in the document along with the new events
+    events = _take_history(steps)
+    steps[step_id] = {
+        **steps[step_id],
+        "status": "completed",
+        "completed_at": now,
+        "form_data": merged_form_data
+    }
+    events.append(_event(step_id, "status_change", "in_progress", "completed", user_id=user_id, timestamp=now))
+
+    activated = unblocked_steps(compiled, steps, step_id)
+    for next_step_id in activated:
+        next_step = steps.get(next_step_id) or {"assignee_id": None, "form_data": {}}
+        steps[next_step_id] = {
+            **next_step,
+            "status": "in_progress",
+            "started_at": now
+        }
+        events.append(_event(next_step_id, "status_change", "pending", "in_progress", timestamp=now))
+    assign_open_steps(db, {"steps": {next_step_id: steps[next_step_id] for next_step_id in activated}}, template)
+
+    if all((steps.get(other) or {}).get("status") == "completed" for other in compiled.order):
+        db_ticket.status = "completed"
+    flag_modified(db_ticket, "workflow_data")
+
+    _update_step_rows(db, ticket_id, steps, [step_id] + activated)
+    assignment.adjust_open_work(
+        released,
+        [steps[next_step_id]["assignee_id"] for next_step_id in activated if steps[next_step_id].get("assignee_id") is not None],
+        db
+    )
+    _index_tickets(db, [db_ticket])
+    _insert_events(db, ticket_id, events)
+    _commit_versioned(db)
+    load_ticket_forms(db, [db_ticket])
     return db_ticket
 
 def delete_ticket(db: Session, ticket_id: int) -> bool:
@@ -105,6 +824,13 @@ def delete_ticket(db: Session, ticket_id: int) -> bool:
     if not db_ticket:
         return False
     
+    db.query(TicketStep).filter(TicketStep.ticket_id == ticket_id).delete(synchronize_session=False)
+    db.query(TicketEvent).filter(TicketEvent.ticket_id == ticket_id).delete(synchronize_session=False)
+    search.remove_documents(db, search.TICKETS, [ticket_id])
     db.delete(db_ticket)
     db.commit()
+    if isinstance(db_ticket, Ticket):
+        # Archiving already released the steps of archived tickets
+        open_steps = _open_assignments((db_ticket.workflow_data or {}).get("steps") or {})
+        assignment.adjust_open_work([user_id for _, user_id in open_steps], [])
     return True
\ No newline at end of file
@@ -1,32 +1,93 @@
-from typing import List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any, Sequence
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from ..models.ticket_template import TicketTemplate
+from ..models.ticket_template import TicketTemplate, TicketTemplateVersion
 from ..schemas.ticket_template import TicketTemplateCreate, TicketTemplateUpdate
+from ..common.pagination import paginate
+from ..common.fieldsets import select_columns, rows_to_dicts
+from ..common import response_cache
+from ..common.workflow import (
+    compile_workflow, invalidate_compiled_workflow, get_version_form_definitions, remember_version_form_definitions
+)
+
+TEMPLATE_ORDER = ((TicketTemplate.id, False),)
+# Left out of template lists unless requested with ?fields=
+TEMPLATE_DEFERRED_FIELDS = ("workflow",)
 
 def get_ticket_template(db: Session, template_id: int) -> Optional[TicketTemplate]:
     return db.query(TicketTemplate).filter(TicketTemplate.id == template_id).first()
 
+def get_form_definitions(workflow: Optional[List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    return {step["id"]: step.get("form", []) for step in workflow or []}
+
+def create_template_version(
+    db: Session,
+    template: TicketTemplate,
+    form_definitions: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    current: bool = True
+) -> TicketTemplateVersion:
+    """Snapshot the template's workflow as its next version, in the caller's transaction."""
+    latest = db.query(func.max(TicketTemplateVersion.version)).filter(
+        TicketTemplateVersion.template_id == template.id
+    ).scalar() or 0
+    db_version = TicketTemplateVersion(
+        template_id=template.id,
+        version=latest + 1,
+        workflow=template.workflow,
+        workflow_config=template.workflow_config,
+        form_definitions=form_definitions if form_definitions is not None else get_form_definitions(template.workflow)
+    )
+    db.add(db_version)
+    db.flush()
+    if current:
+        template.current_version_id = db_version.id
+    return db_version
+
+def get_template_version(db: Session, version_id: int) -> Optional[TicketTemplateVersion]:
+    return db.query(TicketTemplateVersion).filter(TicketTemplateVersion.id == version_id).first()
+
+def load_template_versions(db: Session, version_ids: Iterable[Optional[int]]) -> None:
+    """Make sure the forms of the given versions are in the version cache."""
+    missing = {version_id for version_id in version_ids if version_id and get_version_form_definitions(version_id) is None}
+    if not missing:
+        return
+    rows = db.query(TicketTemplateVersion.id, TicketTemplateVersion.form_definitions).filter(
+        TicketTemplateVersion.id.in_(missing)
+    ).all()
+    for version_id, form_definitions in rows:
+        remember_version_form_definitions(version_id, form_definitions or {})
+
 def get_ticket_templates(
     db: Session,
     skip: int = 0,
-    limit: int = 100
-) -> List[TicketTemplate]:
-    return db.query(TicketTemplate).offset(skip).limit(limit).all()
+    limit: int = 100,
+    after: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None
+) -> List[Any]:
+    """Templates as models, or as dicts of just ``columns`` when given."""
+    if columns is None:
+        return paginate(db.query(TicketTemplate), TEMPLATE_ORDER, after=after, skip=skip, limit=limit).all()
+    query = select_columns(db, TicketTemplate, columns)
+    return rows_to_dicts(paginate(query, TEMPLATE_ORDER, after=after, skip=skip, limit=limit).all())
 
 def create_ticket_template(
     db: Session,
     template: TicketTemplateCreate,
     created_by: int
 ) -> TicketTemplate:
+    template_data = template.model_dump()
+    compile_workflow(template_data["workflow"], template_data["workflow_config"]["parallel_execution"])
     db_template = TicketTemplate(
-        **template.model_dump(),
+        **template_data,
         created_by=created_by
     )
     db.add(db_template)
+    db.flush()
+    create_template_version(db, db_template)
     db.commit()
-    db.refresh(db_template)
+    response_cache.invalidate("templates")
     return db_template
 
 def update_ticket_template(
@@ -39,12 +100,23 @@ def update_ticket_template(
         return None
     
     update_data = template.model_dump(exclude_unset=True)
+    workflow_changed = any(
+        field in update_data and update_data[field] != getattr(db_template, field)
+        for field in ("workflow", "workflow_config")
+    )
+    if workflow_changed:
+        workflow = update_data.get("workflow", db_template.workflow)
+        workflow_config = update_data.get("workflow_config", db_template.workflow_config) or {}
+        compile_workflow(workflow, bool(workflow_config.get("parallel_execution")))
     for field, value in update_data.items():
         setattr(db_template, field, value)
+    if workflow_changed or db_template.current_version_id is None:
+        create_template_version(db, db_template)
     
     db_template.updated_at = datetime.utcnow()
     db.commit()
-    db.refresh(db_template)
+    invalidate_compiled_workflow(template_id)
+    response_cache.invalidate("templates")
     return db_template
 
 def delete_ticket_template(db: Session, template_id: int) -> bool:
@@ -54,4 +126,6 @@ def delete_ticket_template(db: Session, template_id: int) -> bool:
     
     db.delete(db_template)
     db.commit()
+    invalidate_compiled_workflow(template_id)
+    response_cache.invalidate("templates")
     return True
\ No newline at end of file
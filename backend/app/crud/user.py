@@ -1,12 +1,18 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import Optional, List
+from typing import Any, Optional, List, Sequence
 from fastapi import UploadFile
 
 from ..models.user import User
 from ..schemas.user import UserCreate, UserUpdate
 from ..common.storage import save_avatar, delete_avatar
-from ..common.auth import get_password_hash
+from ..common.auth import get_password_hash, set_security_version
+from ..common.pagination import paginate
+from ..common.fieldsets import select_columns, rows_to_dicts
+from ..common.assignment import invalidate_role_members
+from .role import invalidate_user_permissions
+
+USER_ORDER = ((User.id, False),)
 
 def get_user(db: Session, user_id: int) -> Optional[User]:
     return db.query(User).filter(User.id == user_id).first()
@@ -17,11 +23,22 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
     return db.query(User).filter(User.username == username).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None
+) -> List[Any]:
+    """Users as models, or as dicts of just ``columns`` when given."""
+    if columns is None:
+        return paginate(db.query(User), USER_ORDER, after=after, skip=skip, limit=limit).all()
+    query = select_columns(db, User, columns)
+    return rows_to_dicts(paginate(query, USER_ORDER, after=after, skip=skip, limit=limit).all())
 
-def create_user(db: Session, user: UserCreate) -> User:
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -33,7 +50,6 @@ def create_user(db: Session, user: UserCreate) -> User:
     try:
         db.add(db_user)
         db.commit()
-        db.refresh(db_user)
         return db_user
     except IntegrityError:
         db.rollback()
@@ -53,29 +69,57 @@ async def update_user_avatar(db: Session, user_id: int, avatar: UploadFile) -> O
     db_user.avatar_url = avatar_url
 
     db.commit()
-    db.refresh(db_user)
     return db_user
 
-def update_user(db: Session, user_id: int, user: UserUpdate) -> Optional[User]:
+def update_user(db: Session, user_id: int, user: UserUpdate, hashed_password: Optional[str] = None) -> Optional[User]:
     db_user = get_user(db, user_id)
     if not db_user:
         return None
     
     update_data = user.model_dump(exclude_unset=True)
-    if update_data.get("password"):
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+    password = update_data.pop("password", None)
+    if password and hashed_password is None:
+        hashed_password = get_password_hash(password)
+    if hashed_password is not None:
+        update_data["hashed_password"] = hashed_password
+    revoke_tokens = hashed_password is not None or update_data.get("is_active") is False
     
     for field, value in update_data.items():
         setattr(db_user, field, value)
+    if revoke_tokens:
+        db_user.security_version = (db_user.security_version or 0) + 1
     
     try:
         db.commit()
-        db.refresh(db_user)
+        if revoke_tokens:
+            set_security_version(db_user.id, db_user.security_version)
+        if "is_active" in update_data:
+            invalidate_role_members()
         return db_user
     except IntegrityError:
         db.rollback()
         raise ValueError("Email or username already taken")
 
+def set_password_hash(db: Session, user_id: int, hashed_password: str) -> Optional[User]:
+    # Used to upgrade a hash in place, so issued tokens stay valid
+    db_user = get_user(db, user_id)
+    if not db_user:
+        return None
+
+    db_user.hashed_password = hashed_password
+    db.commit()
+    return db_user
+
+def bump_security_version(db: Session, user_id: int) -> Optional[User]:
+    db_user = get_user(db, user_id)
+    if not db_user:
+        return None
+
+    db_user.security_version = (db_user.security_version or 0) + 1
+    db.commit()
+    set_security_version(db_user.id, db_user.security_version)
+    return db_user
+
 def delete_user(db: Session, user_id: int) -> bool:
     db_user = get_user(db, user_id)
     if not db_user:
@@ -87,4 +131,6 @@ def delete_user(db: Session, user_id: int) -> bool:
     
     db.delete(db_user)
     db.commit()
+    invalidate_user_permissions(user_id)
+    set_security_version(user_id, None)
     return True
\ No newline at end of file
@@ -1,10 +1,93 @@
-from sqlalchemy import create_engine
+import hashlib
+import os
+import time
+from fastapi import Request
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from typing import Any, Callable, Dict, Optional, Union
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from .settings import SQLALCHEMY_DATABASE_URL
+from sqlalchemy.orm import sessionmaker, Session
+from .settings import (
+    SQLALCHEMY_DATABASE_URL, DATABASE_ASYNC, ASYNC_DATABASE_URL, DATABASE_READ_URL, ASYNC_DATABASE_READ_URL,
+    READ_YOUR_WRITES_SECONDS, SQLITE_TUNED, SQLITE_WRITE_POOL_SIZE,
+    SQLITE_READ_POOL_SIZE, SQLITE_POOL_TIMEOUT_SECONDS, SQLITE_BUSY_TIMEOUT_MS, SQLITE_SYNCHRONOUS,
+    SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB, JSON_COMPRESSION
+)
+from .common import compressed_json, search
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def get_async_database_url(url: str) -> str:
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def get_sqlite_read_only_url(url: str) -> str:
+    url = make_url(url)
+    path = os.path.abspath(url.database)
+    return url.set(database=f"file:{path}", query={"mode": "ro", "uri": "true"}).render_as_string(hide_password=False)
+
+def _sqlite_pragmas(read_only: bool):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+    return set_pragmas
+
+def _is_sqlite_file(url: str) -> bool:
+    url = make_url(url)
+    database = url.database or ""
+    in_memory = database in ("", ":memory:") or url.query.get("mode") == "memory" or database.startswith("file::memory:")
+    return url.get_backend_name() == "sqlite" and not in_memory
+
+# Tuned SQLite: WAL journaling, per-connection pragmas, a small writer pool
+# (one connection by default) and a separate pool of read-only connections.
+# In-memory databases have no file for the read-only pool to open.
+SQLITE_SPLIT_POOLS = SQLITE_TUNED and _is_sqlite_file(SQLALCHEMY_DATABASE_URL)
+SQLITE_ENGINE_OPTIONS = {"pool_size": SQLITE_WRITE_POOL_SIZE, "max_overflow": 0, "pool_timeout": SQLITE_POOL_TIMEOUT_SECONDS}
+SQLITE_READ_ENGINE_OPTIONS = {"pool_size": SQLITE_READ_POOL_SIZE, "max_overflow": 0, "pool_timeout": SQLITE_POOL_TIMEOUT_SECONDS}
+
+def _create_engines(create, url: str, read_url: Optional[str] = None):
+    if read_url:
+        return create(url), create(read_url)
+    if not SQLITE_SPLIT_POOLS:
+        write_engine = create(url)
+        return write_engine, write_engine
+    write_engine = create(url, **SQLITE_ENGINE_OPTIONS)
+    read_engine = create(get_sqlite_read_only_url(url), **SQLITE_READ_ENGINE_OPTIONS)
+    sync_engine = lambda e: getattr(e, "sync_engine", e)
+    event.listen(sync_engine(write_engine), "connect", _sqlite_pragmas(read_only=False))
+    event.listen(sync_engine(read_engine), "connect", _sqlite_pragmas(read_only=True))
+    return write_engine, read_engine
+
+engine, read_engine = _create_engines(create_engine, SQLALCHEMY_DATABASE_URL, DATABASE_READ_URL)
+# Objects keep their state after commit; generated values come back through
+# RETURNING, so CRUD functions don't need a refresh round-trip
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
+
+# The sync engine is always created: it runs schema setup and serves scripts
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if DATABASE_ASYNC:
+    async_engine, async_read_engine = _create_engines(
+        create_async_engine,
+        ASYNC_DATABASE_URL or get_async_database_url(SQLALCHEMY_DATABASE_URL),
+        ASYNC_DATABASE_READ_URL or (get_async_database_url(DATABASE_READ_URL) if DATABASE_READ_URL else None)
+    )
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -12,16 +95,130 @@ Base = declarative_base()
 from .models.user import User
 from .models.role import Role, UserRole
 from .models.ticket import Ticket
-from .models.ticket_template import TicketTemplate
+from .models.ticket_archive import TicketArchive
+from .models.ticket_step import TicketStep
+from .models.ticket_event import TicketEvent
+from .models.ticket_template import TicketTemplate, TicketTemplateVersion
 from .models.preferences import UserPreferences
-from .models.resource import ResourceType, ResourceEntry
+from .models.resource import ResourceType, ResourceEntry, ResourceEntryIndex
+from .models.compression_dictionary import CompressionDictionary
+
+def _add_missing_columns():
+    # create_all() never alters existing tables, so add columns introduced after
+    # a table was first created
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    ddl += f" DEFAULT {getattr(default, 'text', default)}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.execute(text(ddl))
+
+def _create_missing_indexes():
+    # Same for indexes declared on tables that already exist
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
 
 # Create all tables in the database
 Base.metadata.create_all(bind=engine)
+_add_missing_columns()
+_create_missing_indexes()
+search.create_indexes(engine)
+if JSON_COMPRESSION == "zstd":
+    with engine.connect() as conn:
+        compressed_json.load_dictionaries(conn)
+
+# Read-your-writes: clients (keyed by their Authorization header) that committed
+# a write keep reading from the primary until the replica has caught up
+_primary_sticky_until: Dict[str, float] = {}
+_PRIMARY_STICKY_MAX_CLIENTS = 10000
+
+@event.listens_for(Session, "after_commit")
+def _mark_session_committed(session):
+    session.info["committed"] = True
+
+def _client_key(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization")
+    return hashlib.sha256(authorization.encode()).hexdigest() if authorization else None
 
-def get_db():
+def mark_primary_sticky(request: Request) -> None:
+    key = _client_key(request)
+    if key is None or not DATABASE_READ_URL:
+        return
+    now = time.monotonic()
+    if len(_primary_sticky_until) >= _PRIMARY_STICKY_MAX_CLIENTS:
+        for expired in [k for k, until in _primary_sticky_until.items() if until <= now]:
+            del _primary_sticky_until[expired]
+    _primary_sticky_until[key] = now + READ_YOUR_WRITES_SECONDS
+
+def _is_primary_sticky(request: Request) -> bool:
+    key = _client_key(request)
+    return key is not None and _primary_sticky_until.get(key, 0) > time.monotonic()
+
+def get_db(request: Request):
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        if db.info.get("committed"):
+            mark_primary_sticky(request)
+        db.close()
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        finally:
+            if db.sync_session.info.get("committed"):
+                mark_primary_sticky(request)
+
+def get_read_db(request: Request):
+    db = SessionLocal() if _is_primary_sticky(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    session_factory = AsyncSessionLocal if _is_primary_sticky(request) else AsyncReadSessionLocal
+    async with session_factory() as db:
+        yield db
+
+# Session dependencies used by the routers; CRUD calls go through app.crud.aio,
+# which accepts either session type. Read-only routes use get_read_session,
+# which is the same dependency as get_session unless reads have their own engine.
+get_session = get_async_db if DATABASE_ASYNC else get_db
+if read_engine is not engine:
+    get_read_session = get_async_read_db if DATABASE_ASYNC else get_read_db
+else:
+    get_read_session = get_session
+
+async def run_in_session(db: Union[Session, AsyncSession], func: Callable, *args, **kwargs) -> Any:
+    """Call ``func(session, *args, **kwargs)`` with a sync session.
+
+    Async sessions run it through ``run_sync`` so its queries are awaited on
+    the event loop instead of blocking it.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(func, *args, **kwargs)
+    return func(db, *args, **kwargs)
+
+async def run_on_primary(func: Callable, *args, **kwargs) -> Any:
+    """Run ``func`` in a short-lived session on the primary database."""
+    if DATABASE_ASYNC:
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(func, *args, **kwargs)
+    with SessionLocal() as db:
+        return func(db, *args, **kwargs)
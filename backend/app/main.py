@@ -1,13 +1,25 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from .routers import ticket, ticket_template, user, role, file, preferences, resource, ai
-from .settings import STORAGE_DIR
+from .common.archival import run_archival
+from .settings import STORAGE_DIR, ARCHIVE_AFTER_DAYS
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    archival = asyncio.create_task(run_archival()) if ARCHIVE_AFTER_DAYS > 0 else None
+    yield
+    if archival:
+        archival.cancel()
 
 app = FastAPI(
     title="XOA (Thinkers AI OA) API",
     description="XOA (Thinkers AI OA): A low-code OA System.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 app.include_router(ticket.router)
@@ -27,6 +39,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Mount static file directory for avatars
@@ -0,0 +1,271 @@
+"""Maintenance commands. Run from the backend directory:
+
+    python -m app.manage <command>
+"""
+import argparse
+import json
+from datetime import datetime, timedelta
+
+import orjson
+from sqlalchemy import LargeBinary, String, bindparam, inspect, text
+
+from .common import search
+from .common.compressed_json import MAGIC, decode, encode, load_dictionaries, zstandard
+from .database import Base, SessionLocal, engine
+from .models.compression_dictionary import CompressionDictionary
+from .models.ticket import Ticket
+from .models.ticket_template import TicketTemplate, TicketTemplateVersion
+from .crud.ticket import _insert_events, _take_history, archive_tickets, reindex_ticket_search, sync_ticket_steps
+from .crud.ticket_template import create_template_version
+from .crud.resource import reindex_resource_entries
+from .models.resource import ResourceType
+from .settings import ARCHIVE_AFTER_DAYS, JSON_COMPRESSION
+
+# Columns declared with json_column(), as (table, column)
+JSON_COLUMNS = (
+    ("tickets", "workflow_data"), ("tickets_archive", "workflow_data"), ("ticket_templates", "workflow"),
+    ("resource_entries", "data")
+)
+
+def _dictionary_key(table: str, column: str) -> str:
+    # tickets_archive shares the dictionary of tickets.workflow_data
+    return getattr(Base.metadata.tables[table].c[column].type, "column", f"{table}.{column}")
+
+def rebuild_ticket_steps(args: argparse.Namespace) -> None:
+    last_id, total = 0, 0
+    with SessionLocal() as db:
+        while True:
+            tickets = db.query(Ticket).filter(Ticket.id > last_id).order_by(Ticket.id).limit(args.batch_size).all()
+            if not tickets:
+                break
+            for ticket in tickets:
+                sync_ticket_steps(db, ticket)
+            db.commit()
+            db.expunge_all()
+            last_id = tickets[-1].id
+            total += len(tickets)
+    print(f"Rebuilt steps for {total} tickets")
+
+def migrate_template_versions(args: argparse.Namespace) -> None:
+    """Point existing tickets at template versions and drop their copied form definitions."""
+    with SessionLocal() as db:
+        templates = {template.id: template for template in db.query(TicketTemplate).all()}
+        for template in templates.values():
+            if template.current_version_id is None:
+                create_template_version(db, template)
+        db.commit()
+
+        # (template id, canonical forms JSON) -> (version id, version number)
+        versions = {
+            (version.template_id, json.dumps(version.form_definitions, sort_keys=True)): (version.id, version.version)
+            for version in db.query(TicketTemplateVersion).all()
+        }
+        last_id, total = 0, 0
+        while True:
+            tickets = db.query(Ticket).filter(Ticket.id > last_id, Ticket.template_version_id.is_(None)).order_by(
+                Ticket.id
+            ).limit(args.batch_size).all()
+            if not tickets:
+                break
+            for ticket in tickets:
+                template = templates.get(ticket.template_id)
+                metadata = (ticket.workflow_data or {}).get("metadata")
+                if template is None or metadata is None:
+                    continue
+                form_definitions = metadata.get("form_definitions") or {}
+                key = (template.id, json.dumps(form_definitions, sort_keys=True))
+                if key not in versions:
+                    # Forms changed since the ticket was created; keep them as a non-current version
+                    version = create_template_version(db, template, form_definitions, current=False)
+                    versions[key] = (version.id, version.version)
+                version_id, version_number = versions[key]
+                metadata = {name: value for name, value in metadata.items() if name != "form_definitions"}
+                metadata.update(template_version=str(version_number), template_version_id=version_id)
+                ticket.workflow_data = {**ticket.workflow_data, "metadata": metadata}
+                ticket.template_version_id = version_id
+                total += 1
+            db.commit()
+            for ticket in tickets:
+                db.expunge(ticket)
+            last_id = tickets[-1].id
+    print(f"Migrated {total} tickets to template versions")
+
+def migrate_ticket_events(args: argparse.Namespace) -> None:
+    """Move step history stored in ticket workflow data into ticket_events."""
+    last_id, total = 0, 0
+    with SessionLocal() as db:
+        while True:
+            tickets = db.query(Ticket).filter(Ticket.id > last_id).order_by(Ticket.id).limit(args.batch_size).all()
+            if not tickets:
+                break
+            for ticket in tickets:
+                steps = dict((ticket.workflow_data or {}).get("steps") or {})
+                if not any(isinstance(step, dict) and "history" in step for step in steps.values()):
+                    continue
+                events = _take_history(steps)
+                _insert_events(db, ticket.id, events)
+                ticket.workflow_data = {**ticket.workflow_data, "steps": steps}
+                total += len(events)
+            db.commit()
+            db.expunge_all()
+            last_id = tickets[-1].id
+    print(f"Moved {total} history entries to ticket_events")
+
+def _is_binary(table: str, column: str) -> bool:
+    with engine.connect() as conn:
+        columns = {info["name"]: info["type"] for info in inspect(conn).get_columns(table)}
+    return isinstance(columns[column], LargeBinary)
+
+def compress_json_columns(args: argparse.Namespace) -> None:
+    """Rewrite large JSON columns in the encoding JSON_COMPRESSION selects.
+
+    Turning compression off decompresses values again. On PostgreSQL the column
+    type is switched between json and bytea as needed.
+    """
+    postgres = engine.dialect.name == "postgresql"
+    for table, column in JSON_COLUMNS:
+        key = _dictionary_key(table, column)
+        binary = _is_binary(table, column)
+        if JSON_COMPRESSION and postgres and not binary:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE bytea USING convert_to({column}::text, 'UTF8')"
+                ))
+            binary = True
+        elif not JSON_COMPRESSION and postgres and not binary:
+            continue
+
+        last_id, total = 0, 0
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    text(f"SELECT id, {column} FROM {table} WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                    {"last_id": last_id, "limit": args.batch_size}
+                ).all()
+                if not rows:
+                    break
+                updates = []
+                for row_id, raw in rows:
+                    if raw is None:
+                        continue
+                    raw = bytes(raw) if isinstance(raw, memoryview) else raw
+                    if not JSON_COMPRESSION and not (isinstance(raw, bytes) and raw.startswith(MAGIC)):
+                        continue
+                    stored = encode(key, decode(raw))
+                    if not JSON_COMPRESSION and not binary:
+                        stored = stored.decode()
+                    if stored != raw:
+                        updates.append({"id": row_id, "value": stored})
+                if updates:
+                    conn.execute(
+                        text(f"UPDATE {table} SET {column} = :value WHERE id = :id").bindparams(
+                            bindparam("value", type_=LargeBinary if binary or JSON_COMPRESSION else String)
+                        ),
+                        updates
+                    )
+                total += len(updates)
+                last_id = rows[-1][0]
+
+        if not JSON_COMPRESSION and postgres and binary:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE json USING convert_from({column}, 'UTF8')::json"
+                ))
+        print(f"Rewrote {total} values of {key}")
+
+def train_json_dictionary(args: argparse.Namespace) -> None:
+    """Train a zstd dictionary on recent values of a JSON column.
+
+    New values use it once the app is restarted; compress-json-columns
+    recompresses existing ones.
+    """
+    if zstandard is None:
+        raise SystemExit("Training dictionaries requires the zstandard package")
+    table, column = args.column.split(".")
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY id DESC LIMIT :limit"),
+            {"limit": args.samples}
+        ).scalars()
+        samples = [orjson.dumps(decode(raw), option=orjson.OPT_NON_STR_KEYS) for raw in rows]
+    try:
+        dictionary = zstandard.train_dictionary(args.size, samples)
+    except zstandard.ZstdError as e:
+        raise SystemExit(f"Could not train a dictionary from {len(samples)} samples: {e}")
+    with SessionLocal() as db:
+        row = CompressionDictionary(column=args.column, data=dictionary.as_bytes())
+        db.add(row)
+        db.commit()
+    with engine.connect() as conn:
+        load_dictionaries(conn)
+    print(f"Stored dictionary {row.id} for {args.column} ({len(row.data)} bytes, {len(samples)} samples)")
+
+def archive_closed_tickets(args: argparse.Namespace) -> None:
+    updated_before = datetime.utcnow() - timedelta(days=args.days)
+    total = 0
+    with SessionLocal() as db:
+        while True:
+            archived = archive_tickets(db, updated_before, args.batch_size)
+            total += archived
+            if archived < args.batch_size:
+                break
+    print(f"Archived {total} tickets")
+
+def rebuild_resource_index(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        for (resource_type_id,) in db.query(ResourceType.id).order_by(ResourceType.id).all():
+            indexed = reindex_resource_entries(db, resource_type_id, args.batch_size)
+            db.commit()
+            print(f"Indexed {indexed} entries of resource type {resource_type_id}")
+        search.optimize(db, search.RESOURCE_ENTRIES)
+        db.commit()
+
+def rebuild_ticket_search(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        indexed = reindex_ticket_search(db, args.batch_size)
+    print(f"Indexed {indexed} tickets")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("rebuild-ticket-steps", help="Rebuild ticket_steps from ticket workflow data")
+    command.add_argument("--batch-size", type=int, default=500)
+    command.set_defaults(func=rebuild_ticket_steps)
+
+    command = commands.add_parser("migrate-template-versions", help="Move ticket form definitions onto template versions")
+    command.add_argument("--batch-size", type=int, default=500)
+    command.set_defaults(func=migrate_template_versions)
+
+    command = commands.add_parser("migrate-ticket-events", help="Move step history from ticket workflow data to ticket_events")
+    command.add_argument("--batch-size", type=int, default=500)
+    command.set_defaults(func=migrate_ticket_events)
+
+    command = commands.add_parser("rebuild-resource-index", help="Rebuild the resource entry filter and search indexes")
+    command.add_argument("--batch-size", type=int, default=500)
+    command.set_defaults(func=rebuild_resource_index)
+
+    command = commands.add_parser("rebuild-ticket-search", help="Rebuild the ticket search index, archived tickets included")
+    command.add_argument("--batch-size", type=int, default=500)
+    command.set_defaults(func=rebuild_ticket_search)
+
+    command = commands.add_parser("archive-tickets", help="Move tickets closed for a while to tickets_archive")
+    command.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS or 90, help="Days since the last update")
+    command.add_argument("--batch-size", type=int, default=500)
+    command.set_defaults(func=archive_closed_tickets)
+
+    command = commands.add_parser("compress-json-columns", help="Rewrite large JSON columns as JSON_COMPRESSION selects")
+    command.add_argument("--batch-size", type=int, default=500)
+    command.set_defaults(func=compress_json_columns)
+
+    command = commands.add_parser("train-json-dictionary", help="Train a zstd dictionary for a JSON column")
+    command.add_argument("--column", required=True, choices=sorted({_dictionary_key(table, column) for table, column in JSON_COLUMNS}))
+    command.add_argument("--size", type=int, default=64 * 1024, help="Dictionary size in bytes")
+    command.add_argument("--samples", type=int, default=5000)
+    command.set_defaults(func=train_json_dictionary)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from datetime import datetime
+
+from ..database import Base
+
+class CompressionDictionary(Base):
+    """A zstd dictionary trained for one JSON column.
+
+    Rows are never deleted: values compressed with a dictionary need it to be read.
+    """
+    __tablename__ = "compression_dictionaries"
+
+    id = Column(Integer, primary_key=True)
+    column = Column(String, nullable=False, index=True)  # "<table>.<column>"
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Float, Index
 from sqlalchemy.sql import func
 from app.database import Base
+from app.common.compressed_json import json_column
 
 class ResourceType(Base):
     __tablename__ = "resource_types"
+    # Fetch server-generated timestamps with RETURNING instead of a refresh query
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -16,9 +19,36 @@ class ResourceType(Base):
 
 class ResourceEntry(Base):
     __tablename__ = "resource_entries"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index("ix_resource_entries_type_id_id", "resource_type_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     resource_type_id = Column(Integer, index=True)
-    data = Column(JSON)
+    data = Column(json_column("resource_entries.data"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class ResourceEntryIndex(Base):
+    """One value of a filterable field of a resource entry, typed for range filters.
+
+    Maintained by the resource entry CRUD functions; a multi-valued field has
+    one row per value. Exactly one of the value columns is set.
+    """
+    __tablename__ = "resource_entry_index"
+    __table_args__ = (
+        # (type, field, value) lookups for equality, IN and range filters,
+        # ending in entry_id so the matches are read from the index alone
+        Index("ix_resource_entry_index_str", "resource_type_id", "field", "str_value", "entry_id"),
+        Index("ix_resource_entry_index_num", "resource_type_id", "field", "num_value", "entry_id"),
+        Index("ix_resource_entry_index_date", "resource_type_id", "field", "date_value", "entry_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    entry_id = Column(Integer, nullable=False, index=True)
+    resource_type_id = Column(Integer, nullable=False)
+    field = Column(String, nullable=False)
+    str_value = Column(String)
+    num_value = Column(Float)
+    date_value = Column(DateTime)
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from ..database import Base
+from ..common.compressed_json import json_column
 
 class Ticket(Base):
     __tablename__ = "tickets"
@@ -16,7 +17,24 @@ class Ticket(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = Column(Integer, ForeignKey("users.id"))
     template_id = Column(Integer, ForeignKey("ticket_templates.id"))
-    workflow_data = Column(JSON)  # Stores workflow step data including status, assignee, timestamps and form data
+    template_version_id = Column(Integer, ForeignKey("ticket_template_versions.id"), index=True)
+    workflow_data = Column(json_column("tickets.workflow_data"))  # Stores workflow step data including status, assignee, timestamps and form data
+    # Bumped on every update; updates of a stale row raise StaleDataError
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     creator = relationship("User", foreign_keys=[created_by], back_populates="created_tickets")
-    template = relationship("TicketTemplate", back_populates="tickets")
\ No newline at end of file
+    template = relationship("TicketTemplate", back_populates="tickets")
+
+    __table_args__ = (
+        # Keyset pagination over the default newest-first listing
+        Index("ix_tickets_created_at_id", "created_at", "id"),
+        Index("ix_tickets_updated_at_id", "updated_at", "id"),
+        # Equality filters combined with the default sort
+        Index("ix_tickets_status_created_at", "status", "created_at", "id"),
+        Index("ix_tickets_priority_created_at", "priority", "created_at", "id"),
+        Index("ix_tickets_template_id_created_at", "template_id", "created_at", "id"),
+        Index("ix_tickets_created_by_created_at", "created_by", "created_at", "id"),
+        # Never reuse the id of a ticket that was archived or deleted (new SQLite databases)
+        {"sqlite_autoincrement": True},
+    )
+    __mapper_args__ = {"version_id_col": version}
\ No newline at end of file
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+
+from ..database import Base
+from ..common.compressed_json import json_column
+
+class TicketArchive(Base):
+    """Closed tickets moved out of ``tickets`` so its rows and indexes stay small.
+
+    Has the same columns as ``Ticket`` (rows are copied with INSERT ... SELECT)
+    plus ``archived_at``. Their ticket_events stay in place.
+    """
+    __tablename__ = "tickets_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String)
+    description = Column(String)
+    status = Column(String)
+    priority = Column(String)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    created_by = Column(Integer)
+    template_id = Column(Integer)
+    template_version_id = Column(Integer)
+    # Shares the tickets column's compression dictionary, since values are copied as stored
+    workflow_data = Column(json_column("tickets.workflow_data"))
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    archived_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_tickets_archive_created_at_id", "created_at", "id"),
+        Index("ix_tickets_archive_updated_at_id", "updated_at", "id"),
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from datetime import datetime
+
+from ..database import Base
+
+class TicketEvent(Base):
+    """Append-only log of ticket and step events (status changes, comments, ...).
+
+    Replaces the ``history`` arrays that used to grow inside ``Ticket.workflow_data``.
+    """
+    __tablename__ = "ticket_events"
+
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, nullable=False)
+    step_id = Column(String)
+    type = Column(String, nullable=False)
+    from_status = Column(String)
+    to_status = Column(String)
+    user_id = Column(Integer)
+    content = Column(Text)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Paginated history of one ticket, oldest first
+        Index("ix_ticket_events_ticket_id_timestamp_id", "ticket_id", "timestamp", "id"),
+    )
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+
+from ..database import Base
+
+class TicketStep(Base):
+    """Queryable copy of the step state held in ``Ticket.workflow_data``.
+
+    One row per (ticket, step, assignable role), or a single row with no role
+    when the step has none. Rewritten whenever the ticket's workflow data changes.
+    """
+    __tablename__ = "ticket_steps"
+
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, ForeignKey("tickets.id", ondelete="CASCADE"), nullable=False, index=True)
+    step_id = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    assignee_id = Column(Integer, ForeignKey("users.id"))
+    role = Column(String)
+    started_at = Column(DateTime)
+
+    ticket = relationship("Ticket")
+
+    __table_args__ = (
+        Index("ix_ticket_steps_assignee_id_status", "assignee_id", "status"),
+        Index("ix_ticket_steps_role_status", "role", "status"),
+    )
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from ..database import Base
+from ..common.compressed_json import json_column
 
 class TicketTemplate(Base):
     __tablename__ = "ticket_templates"
@@ -12,10 +13,30 @@ class TicketTemplate(Base):
     description = Column(String)
     title_format = Column(String)
     default_priority = Column(String)
-    workflow = Column(JSON)
+    workflow = Column(json_column("ticket_templates.workflow"))
     workflow_config = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = Column(Integer, ForeignKey("users.id"))
+    current_version_id = Column(Integer)
 
     tickets = relationship("Ticket", back_populates="template")
+
+class TicketTemplateVersion(Base):
+    """Immutable snapshot of a template's workflow, referenced by tickets.
+
+    Rows outlive their template so existing tickets keep resolving their forms.
+    """
+    __tablename__ = "ticket_template_versions"
+
+    id = Column(Integer, primary_key=True)
+    template_id = Column(Integer, nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    workflow = Column(JSON)
+    workflow_config = Column(JSON)
+    form_definitions = Column(JSON)  # Step id -> form fields
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("template_id", "version", name="uq_ticket_template_versions_template_version"),
+    )
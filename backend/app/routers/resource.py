@@ -1,116 +1,163 @@
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.crud import resource as crud_resource
+from app.database import get_session, get_read_session
+from app.crud.aio import resource as crud_resource
 from app.schemas.resource import (
     ResourceType,
     ResourceTypeCreate,
     ResourceEntry,
-    ResourceEntryCreate
+    ResourceEntryCreate,
+    ResourceEntrySearchResult
 )
 from ..common.permissions import has_permissions, PERMISSIONS
+from ..common import write_pipeline
+from ..common.pagination import MAX_PAGE_SIZE, next_cursor_headers
+from ..common.fast_json import json_rows_response
+from ..common.response_cache import cached_json
+from ..common.fieldsets import parse_fields, partial_model
+from ..crud.resource import (
+    RESOURCE_TYPE_ORDER, RESOURCE_ENTRY_ORDER, RESOURCE_ENTRY_DEFERRED_FIELDS, RESOURCE_SEARCH_ORDER
+)
+from ..models.resource import ResourceEntry as ResourceEntryModel
 from ..common.auth import get_current_user
 from ..models.user import User
 
 router = APIRouter(prefix="/resources", tags=["Resources"])
 
+ResourceEntryFields = partial_model(ResourceEntry)
+
 @router.post("/types", response_model=ResourceType)
 @has_permissions([PERMISSIONS['RESOURCE_TYPE_CREATE']])
-def create_resource_type(resource_type: ResourceTypeCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return crud_resource.create_resource_type(db, resource_type)
+async def create_resource_type(resource_type: ResourceTypeCreate, db: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+    return await crud_resource.create_resource_type(db, resource_type)
 
 @router.get("/types", response_model=List[ResourceType])
 @has_permissions([PERMISSIONS['RESOURCE_TYPE_READ']])
-def list_resource_types(
+async def list_resource_types(
+    request: Request,
+    after: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
-    return crud_resource.get_resource_types(db, skip=skip, limit=limit)
+    async def load():
+        resource_types = await crud_resource.get_resource_types(db, skip=skip, limit=limit, after=after)
+        return resource_types, next_cursor_headers(RESOURCE_TYPE_ORDER, resource_types, limit)
+    return await cached_json(request, "resource_types", List[ResourceType], load)
 
 @router.get("/types/{resource_type_id}", response_model=ResourceType)
 @has_permissions([PERMISSIONS['RESOURCE_TYPE_READ']])
-def get_resource_type(resource_type_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_resource_type = crud_resource.get_resource_type(db, resource_type_id)
-    if not db_resource_type:
-        raise HTTPException(status_code=404, detail="Resource type not found")
-    return db_resource_type
+async def get_resource_type(resource_type_id: int, request: Request, db: Session = Depends(get_read_session), current_user: User = Depends(get_current_user)):
+    async def load():
+        db_resource_type = await crud_resource.get_resource_type(db, resource_type_id)
+        if not db_resource_type:
+            raise HTTPException(status_code=404, detail="Resource type not found")
+        return db_resource_type, {}
+    return await cached_json(request, "resource_types", ResourceType, load)
 
 @router.put("/types/{resource_type_id}", response_model=ResourceType)
 @has_permissions([PERMISSIONS['RESOURCE_TYPE_UPDATE']])
-def update_resource_type(
+async def update_resource_type(
     resource_type_id: int,
     resource_type: ResourceTypeCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    db_resource_type = crud_resource.update_resource_type(db, resource_type_id, resource_type)
+    db_resource_type = await crud_resource.update_resource_type(db, resource_type_id, resource_type)
     if not db_resource_type:
         raise HTTPException(status_code=404, detail="Resource type not found")
     return db_resource_type
 
 @router.delete("/types/{resource_type_id}")
 @has_permissions([PERMISSIONS['RESOURCE_TYPE_DELETE']])
-def delete_resource_type(resource_type_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    success = crud_resource.delete_resource_type(db, resource_type_id)
+async def delete_resource_type(resource_type_id: int, db: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+    success = await crud_resource.delete_resource_type(db, resource_type_id)
     if not success:
         raise HTTPException(status_code=404, detail="Resource type not found")
     return {"status": "success"}
 
 @router.post("/entries", response_model=ResourceEntry)
 @has_permissions([PERMISSIONS['RESOURCE_ENTRY_CREATE']])
-def create_resource_entry(
+async def create_resource_entry(
     resource_entry: ResourceEntryCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    return crud_resource.create_resource_entry(db, resource_entry)
+    return await write_pipeline.write(db, crud_resource.create_resource_entry, resource_entry)
 
-@router.get("/types/{resource_type_id}/entries", response_model=List[ResourceEntry])
+@router.get("/types/{resource_type_id}/entries", response_model=List[ResourceEntryFields])
 @has_permissions([PERMISSIONS['RESOURCE_ENTRY_READ']])
-def list_resource_entries(
+async def list_resource_entries(
     resource_type_id: int,
+    after: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
-    filters: Optional[Dict[str, Any]] = None,
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    filters: Optional[List[str]] = Query(
+        None,
+        alias="filter",
+        description="field:op:value on a filterable field; op is eq, in (values separated by |), lt, lte, gt or gte"
+    ),
+    fields: Optional[str] = Query(None, description="Comma-separated fields or *; data is only returned when requested"),
+    db: Session = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        entries = await crud_resource.get_resource_entries(
+            db,
+            resource_type_id,
+            skip=skip,
+            limit=limit,
+            filters=filters,
+            after=after,
+            columns=parse_fields(fields, ResourceEntryModel, ResourceEntry, RESOURCE_ENTRY_DEFERRED_FIELDS)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_rows_response(entries, next_cursor_headers(RESOURCE_ENTRY_ORDER, entries, limit))
+
+@router.get("/types/{resource_type_id}/search", response_model=List[ResourceEntrySearchResult])
+@has_permissions([PERMISSIONS['RESOURCE_ENTRY_READ']])
+async def search_resource_entries(
+    resource_type_id: int,
+    q: str = Query(..., min_length=1, description="Words to find in the type's searchable fields; each also matches as a prefix"),
+    after: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
-    return crud_resource.get_resource_entries(
-        db,
-        resource_type_id,
-        skip=skip,
-        limit=limit,
-        filters=filters
-    )
+    try:
+        entries = await crud_resource.search_resource_entries(db, resource_type_id, q, after=after, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_rows_response(entries, next_cursor_headers(RESOURCE_SEARCH_ORDER, entries, limit))
 
 @router.get("/entries/{entry_id}", response_model=ResourceEntry)
 @has_permissions([PERMISSIONS['RESOURCE_ENTRY_READ']])
-def get_resource_entry(entry_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_entry = crud_resource.get_resource_entry(db, entry_id)
+async def get_resource_entry(entry_id: int, db: Session = Depends(get_read_session), current_user: User = Depends(get_current_user)):
+    db_entry = await crud_resource.get_resource_entry(db, entry_id)
     if not db_entry:
         raise HTTPException(status_code=404, detail="Resource entry not found")
     return db_entry
 
 @router.put("/entries/{entry_id}", response_model=ResourceEntry)
 @has_permissions([PERMISSIONS['RESOURCE_ENTRY_UPDATE']])
-def update_resource_entry(
+async def update_resource_entry(
     entry_id: int,
     resource_entry: Dict[str, Any],
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    db_entry = crud_resource.update_resource_entry(db, entry_id, resource_entry)
+    db_entry = await write_pipeline.write(db, crud_resource.update_resource_entry, entry_id, resource_entry)
     if not db_entry:
         raise HTTPException(status_code=404, detail="Resource entry not found")
     return db_entry
 
 @router.delete("/entries/{entry_id}")
 @has_permissions([PERMISSIONS['RESOURCE_ENTRY_DELETE']])
-def delete_resource_entry(entry_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    success = crud_resource.delete_resource_entry(db, entry_id)
+async def delete_resource_entry(entry_id: int, db: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+    success = await crud_resource.delete_resource_entry(db, entry_id)
     if not success:
         raise HTTPException(status_code=404, detail="Resource entry not found")
     return {"status": "success"}
\ No newline at end of file
@@ -1,67 +1,310 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, List, Optional, Set, Union
+from datetime import datetime
 
-from ..database import get_db
-from ..schemas.ticket import Ticket, TicketCreate, TicketUpdate
-from ..crud import ticket as ticket_crud
+from ..database import get_session, get_read_session
+from ..schemas.ticket import (
+    Ticket, TicketCreate, TicketUpdate, TicketFilter, TicketTask, StepComplete,
+    TicketBulkCreate, TicketBulkUpdate, TicketBulkItemResult, TicketBulkResult, TicketEvent,
+    TicketSearchResult
+)
+from ..crud.aio import ticket as ticket_crud
+from ..crud.aio import role as role_crud
 from ..common.auth import get_current_user
 from ..models.user import User
 from ..common.permissions import has_permissions, PERMISSIONS
+from ..common import write_pipeline
+from ..common.workflow import StepStateError
+from ..common.jsonpatch import PatchTestFailed
+from ..common.pagination import MAX_PAGE_SIZE, next_cursor_headers, set_next_cursor
+from ..common.fast_json import json_rows_response
+from ..common.fieldsets import parse_fields, partial_model
+from ..crud.ticket import (
+    get_ticket_order, TASK_ORDER, EVENT_ORDER, TICKET_DEFERRED_FIELDS, TICKET_SEARCH_ORDER, VersionConflict
+)
+from ..models.ticket import Ticket as TicketModel
+from ..settings import TICKET_BULK_MAX
 
 router = APIRouter(prefix="/tickets", tags=["Tickets"])
 
+TicketFields = partial_model(Ticket)
+TicketSearchFields = partial_model(TicketSearchResult)
+
+def ticket_filters(
+    status: Optional[List[str]] = Query(None),
+    priority: Optional[List[str]] = Query(None),
+    template_id: Optional[List[int]] = Query(None),
+    created_by: Optional[List[int]] = Query(None),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    updated_after: Optional[datetime] = None,
+    updated_before: Optional[datetime] = None,
+    include_archived: bool = Query(False, description="Also include tickets moved to the archive")
+) -> TicketFilter:
+    return TicketFilter(
+        status=status,
+        priority=priority,
+        template_id=template_id,
+        created_by=created_by,
+        created_after=created_after,
+        created_before=created_before,
+        updated_after=updated_after,
+        updated_before=updated_before,
+        include_archived=include_archived
+    )
+
+def _set_etag(response: Response, ticket) -> None:
+    response.headers["ETag"] = f'"{ticket.id}-{ticket.version}"'
+
+def _if_match_versions(ticket_id: int, if_match: Optional[str]) -> Optional[Set[int]]:
+    """Ticket versions named by an If-Match header; None when any version will do."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = set()
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        # If-Match uses strong comparison, so weak tags never match
+        if tag.startswith("W/"):
+            continue
+        tag_ticket_id, _, version = tag.strip('"').partition("-")
+        if tag_ticket_id == str(ticket_id) and version.isdigit():
+            versions.add(int(version))
+    return versions
+
 @router.post("/", response_model=Ticket)
 @has_permissions([PERMISSIONS['TICKET_CREATE']])
 async def create_ticket(
     ticket: TicketCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        return await write_pipeline.write(db, ticket_crud.create_ticket, ticket=ticket, user_id=current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _bulk_result(results: List[TicketBulkItemResult]) -> TicketBulkResult:
+    failed = sum(1 for result in results if result.error)
+    return TicketBulkResult(succeeded=len(results) - failed, failed=failed, results=results)
+
+def _check_bulk_size(count: int) -> None:
+    if count > TICKET_BULK_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {TICKET_BULK_MAX} tickets per request")
+
+@router.post("/bulk", response_model=TicketBulkResult)
+@has_permissions([PERMISSIONS['TICKET_CREATE']])
+async def create_tickets_bulk(
+    bulk: TicketBulkCreate,
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    return ticket_crud.create_ticket(db=db, ticket=ticket, user_id=current_user.id)
+    _check_bulk_size(len(bulk.tickets))
+    results = await ticket_crud.create_tickets(db, tickets=bulk.tickets, user_id=current_user.id)
+    return _bulk_result([
+        TicketBulkItemResult(index=index, id=ticket.id if ticket else None, error=error)
+        for index, (ticket, error) in enumerate(results)
+    ])
 
-@router.get("/", response_model=List[Ticket])
+@router.post("/bulk-update", response_model=TicketBulkResult)
+@has_permissions([PERMISSIONS['TICKET_UPDATE']])
+async def update_tickets_bulk(
+    bulk: TicketBulkUpdate,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    _check_bulk_size(len(bulk.ids))
+    changes = bulk.model_dump(exclude_unset=True, exclude={"ids"})
+    if not changes:
+        raise HTTPException(status_code=400, detail="No changes given")
+    try:
+        results = await ticket_crud.bulk_update_tickets(db, ticket_ids=bulk.ids, changes=changes)
+    except VersionConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _bulk_result([
+        TicketBulkItemResult(index=index, id=ticket_id, error=error)
+        for index, (ticket_id, error) in enumerate(results)
+    ])
+
+@router.get("/", response_model=List[TicketFields])
 @has_permissions([PERMISSIONS['TICKET_READ']])
 async def list_tickets(
+    after: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    sort: Optional[str] = Query(None, description="Comma-separated fields, '-' prefix for descending"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields or *; workflow_data is only returned when requested"),
+    filters: TicketFilter = Depends(ticket_filters),
+    db: Session = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        order = get_ticket_order(sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The sort keys are always selected, since the next cursor is built from them
+    columns = parse_fields(fields, TicketModel, Ticket, TICKET_DEFERRED_FIELDS, required=[column.key for column, _ in order])
+    tickets = await ticket_crud.get_tickets(db, skip=skip, limit=limit, after=after, filters=filters, order=order, columns=columns)
+    return json_rows_response(tickets, next_cursor_headers(order, tickets, limit))
+
+@router.get("/search", response_model=List[TicketSearchFields])
+@has_permissions([PERMISSIONS['TICKET_READ']])
+async def search_tickets(
+    q: str = Query(..., min_length=1, description="Words to find in the title, description or form data"),
+    after: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated fields or *; workflow_data is only returned when requested"),
+    filters: TicketFilter = Depends(ticket_filters),
+    db: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
-    return ticket_crud.get_tickets(db, skip=skip, limit=limit)
+    columns = parse_fields(fields, TicketModel, Ticket, TICKET_DEFERRED_FIELDS)
+    try:
+        tickets = await ticket_crud.search_tickets(db, q, filters=filters, after=after, limit=limit, columns=columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_rows_response(tickets, next_cursor_headers(TICKET_SEARCH_ORDER, tickets, limit))
+
+@router.get("/my-tasks", response_model=List[TicketTask])
+@has_permissions([PERMISSIONS['TICKET_READ']])
+async def list_my_tasks(
+    response: Response,
+    status: str = "in_progress",
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    role_names = await role_crud.get_user_role_names(db, user_id=current_user.id)
+    tasks = await ticket_crud.get_user_tasks(
+        db, user_id=current_user.id, role_names=list(role_names), status=status, after=after, limit=limit
+    )
+    set_next_cursor(response, TASK_ORDER, tasks, limit)
+    return tasks
 
 @router.get("/{ticket_id}", response_model=Ticket)
 @has_permissions([PERMISSIONS['TICKET_READ']])
 async def get_ticket(
     ticket_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
-    ticket = ticket_crud.get_ticket(db, ticket_id=ticket_id)
+    ticket = await ticket_crud.get_ticket(db, ticket_id=ticket_id)
     if ticket is None:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    _set_etag(response, ticket)
     return ticket
 
+@router.get("/{ticket_id}/history", response_model=List[TicketEvent])
+@has_permissions([PERMISSIONS['TICKET_READ']])
+async def get_ticket_history(
+    ticket_id: int,
+    response: Response,
+    step_id: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    events = await ticket_crud.get_ticket_events(db, ticket_id=ticket_id, step_id=step_id, after=after, limit=limit)
+    if events is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    set_next_cursor(response, EVENT_ORDER, events, limit)
+    return events
+
 @router.put("/{ticket_id}", response_model=Ticket)
 @has_permissions([PERMISSIONS['TICKET_UPDATE']])
 async def update_ticket(
     ticket_id: int,
     ticket_update: TicketUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        ticket = await ticket_crud.update_ticket(
+            db, ticket_id=ticket_id, ticket_update=ticket_update,
+            expected_versions=_if_match_versions(ticket_id, if_match)
+        )
+    except VersionConflict as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    _set_etag(response, ticket)
+    return ticket
+
+@router.patch("/{ticket_id}", response_model=Ticket)
+@has_permissions([PERMISSIONS['TICKET_UPDATE']])
+async def patch_ticket(
+    ticket_id: int,
+    response: Response,
+    patch: Union[List[Dict[str, Any]], Dict[str, Any]] = Body(...),
+    content_type: Optional[str] = Header(None),
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Update only the paths named in the body.
+
+    Send ``application/json-patch+json`` (an RFC 6902 operation list) or
+    ``application/merge-patch+json`` (an RFC 7396 object); with plain JSON, an
+    array is taken as JSON Patch and an object as merge patch.
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type == "application/json-patch+json":
+        merge = False
+    elif media_type == "application/merge-patch+json":
+        merge = True
+    else:
+        merge = isinstance(patch, dict)
+    try:
+        ticket = await ticket_crud.patch_ticket(
+            db, ticket_id=ticket_id, patch=patch, merge=merge,
+            expected_versions=_if_match_versions(ticket_id, if_match)
+        )
+    except VersionConflict as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except PatchTestFailed as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    _set_etag(response, ticket)
+    return ticket
+
+@router.post("/{ticket_id}/steps/{step_id}/complete", response_model=Ticket)
+@has_permissions([PERMISSIONS['TICKET_UPDATE']])
+async def complete_ticket_step(
+    ticket_id: int,
+    step_id: str,
+    step: StepComplete,
+    response: Response,
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    ticket = ticket_crud.update_ticket(db, ticket_id=ticket_id, ticket_update=ticket_update)
+    try:
+        ticket = await ticket_crud.complete_ticket_step(
+            db, ticket_id=ticket_id, step_id=step_id, form_data=step.form_data, user_id=current_user.id
+        )
+    except (StepStateError, VersionConflict) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if ticket is None:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    _set_etag(response, ticket)
     return ticket
 
 @router.delete("/{ticket_id}", status_code=status.HTTP_204_NO_CONTENT)
 @has_permissions([PERMISSIONS['TICKET_DELETE']])
 async def delete_ticket(
     ticket_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    result = ticket_crud.delete_ticket(db, ticket_id=ticket_id)
+    result = await ticket_crud.delete_ticket(db, ticket_id=ticket_id)
     if not result:
         raise HTTPException(status_code=404, detail="Ticket not found")
\ No newline at end of file
@@ -1,81 +1,105 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 
-from ..crud import ticket_template
+from ..crud.aio import ticket_template
 from ..schemas.ticket_template import (
     TicketTemplate,
     TicketTemplateCreate,
     TicketTemplateUpdate
 )
-from ..database import get_db
+from ..database import get_session, get_read_session
 from ..schemas.user import User
 from ..common.permissions import has_permissions, PERMISSIONS
 from ..common.auth import get_current_user
+from ..common.pagination import MAX_PAGE_SIZE, next_cursor_headers
+from ..common.response_cache import cached_json
+from ..common.fieldsets import parse_fields, partial_model
+from ..crud.ticket_template import TEMPLATE_ORDER, TEMPLATE_DEFERRED_FIELDS
+from ..models.ticket_template import TicketTemplate as TicketTemplateModel
 
 router = APIRouter(prefix="/ticket-templates", tags=["Tickets"])
 
-@router.get("/", response_model=List[TicketTemplate])
+TicketTemplateFields = partial_model(TicketTemplate)
+
+@router.get("/", response_model=List[TicketTemplateFields], response_model_exclude_unset=True)
 @has_permissions([PERMISSIONS['TICKET_TEMPLATE_READ']])
-def read_ticket_templates(
+async def read_ticket_templates(
+    request: Request,
+    after: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated fields or *; workflow is only returned when requested"),
+    db: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
-    templates = ticket_template.get_ticket_templates(db, skip=skip, limit=limit)
-    return templates
+    # updated_at feeds the ETag
+    columns = parse_fields(fields, TicketTemplateModel, TicketTemplate, TEMPLATE_DEFERRED_FIELDS, required=("id", "updated_at"))
+
+    async def load():
+        templates = await ticket_template.get_ticket_templates(db, skip=skip, limit=limit, after=after, columns=columns)
+        return templates, next_cursor_headers(TEMPLATE_ORDER, templates, limit)
+    return await cached_json(request, "templates", List[TicketTemplateFields], load, exclude_unset=True)
 
 @router.get("/{template_id}", response_model=TicketTemplate)
 @has_permissions([PERMISSIONS['TICKET_TEMPLATE_READ']])
-def read_ticket_template(
+async def read_ticket_template(
     template_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
-    template = ticket_template.get_ticket_template(db, template_id=template_id)
-    if template is None:
-        raise HTTPException(status_code=404, detail="Ticket template not found")
-    return template
+    async def load():
+        template = await ticket_template.get_ticket_template(db, template_id=template_id)
+        if template is None:
+            raise HTTPException(status_code=404, detail="Ticket template not found")
+        return template, {}
+    return await cached_json(request, "templates", TicketTemplate, load)
 
 @router.post("/", response_model=TicketTemplate)
 @has_permissions([PERMISSIONS['TICKET_TEMPLATE_CREATE']])
-def create_ticket_template(
+async def create_ticket_template(
     template: TicketTemplateCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    return ticket_template.create_ticket_template(
-        db=db,
-        template=template,
-        created_by=1  # Temporarily hardcoded user ID
-    )
+    try:
+        return await ticket_template.create_ticket_template(
+            db=db,
+            template=template,
+            created_by=1  # Temporarily hardcoded user ID
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{template_id}", response_model=TicketTemplate)
 @has_permissions([PERMISSIONS['TICKET_TEMPLATE_UPDATE']])
-def update_ticket_template(
+async def update_ticket_template(
     template_id: int,
     template: TicketTemplateUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    updated_template = ticket_template.update_ticket_template(
-        db=db,
-        template_id=template_id,
-        template=template
-    )
+    try:
+        updated_template = await ticket_template.update_ticket_template(
+            db=db,
+            template_id=template_id,
+            template=template
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if updated_template is None:
         raise HTTPException(status_code=404, detail="Ticket template not found")
     return updated_template
 
 @router.delete("/{template_id}")
 @has_permissions([PERMISSIONS['TICKET_TEMPLATE_DELETE']])
-def delete_ticket_template(
+async def delete_ticket_template(
     template_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    success = ticket_template.delete_ticket_template(db=db, template_id=template_id)
+    success = await ticket_template.delete_ticket_template(db=db, template_id=template_id)
     if not success:
         raise HTTPException(status_code=404, detail="Ticket template not found")
     return {"status": "success"}
\ No newline at end of file
@@ -1,31 +1,39 @@
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import os
 from pathlib import Path
 from pydantic import BaseModel
 
-from ..crud import user as crud_user
-from ..crud import role as crud_role
+from ..crud.aio import user as crud_user
+from ..crud.aio import role as crud_role
 from ..schemas.user import User, UserCreate, UserUpdate
 from ..schemas.role import RoleCreate, UserRoleCreate
+from ..database import get_session, get_read_session
+from ..common.pagination import MAX_PAGE_SIZE, next_cursor_headers
+from ..common.fieldsets import parse_fields
+from ..common.fast_json import json_rows_response
+from ..crud.user import USER_ORDER
 from ..models.user import User as UserModel
-from ..database import get_db
-from ..settings import AVATAR_UPLOAD_DIR, ACCESS_TOKEN_EXPIRE_MINUTES
+from jose import jwt, JWTError
+from ..settings import AVATAR_UPLOAD_DIR, ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM
 from ..common.permissions import has_permissions, PERMISSIONS
 from ..common.auth import (
-    verify_password, get_password_hash, create_access_token, create_refresh_token,
-    get_current_user, Token, UserLogin, oauth2_scheme
+    verify_password_async, get_password_hash_async, create_access_token, create_refresh_token,
+    create_token_claims, get_current_user, load_current_user, Token, UserLogin, oauth2_scheme
 )
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+# Every column the User schema exposes, which leaves out hashed_password
+USER_COLUMNS = parse_fields(None, UserModel, User)
+
 @router.post("/", response_model=User)
-async def create_user(user: UserCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_user(user: UserCreate, db: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
     # Check if this is the first user registration
-    existing_users = crud_user.get_users(db, skip=0, limit=1)
+    existing_users = await crud_user.get_users(db, skip=0, limit=1)
     is_first_user = len(existing_users) == 0
 
     # If not first user, check permissions
@@ -34,23 +42,24 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db), current_u
         @has_permissions([PERMISSIONS['USER_CREATE']])
         async def create_user_with_permission(user: UserCreate, db: Session, current_user: User):
             return await create_user_internal(user, db)
-        return await create_user_with_permission(user, db, current_user)
+        return await create_user_with_permission(user, db=db, current_user=current_user)
     
     # For first user, proceed without permission check
     return await create_user_internal(user, db)
 
 async def create_user_internal(user: UserCreate, db: Session):
-    db_user = crud_user.get_user_by_email(db, email=user.email)
+    db_user = await crud_user.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Check if this is the first user registration
-    existing_users = crud_user.get_users(db, skip=0, limit=1)
+    existing_users = await crud_user.get_users(db, skip=0, limit=1)
     is_first_user = len(existing_users) == 0
 
     # Create the user
+    hashed_password = await get_password_hash_async(user.password)
     try:
-        db_user = crud_user.create_user(db=db, user=user)
+        db_user = await crud_user.create_user(db=db, user=user, hashed_password=hashed_password)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -63,16 +72,15 @@ async def create_user_internal(user: UserCreate, db: Session):
             permissions=["*"]  # Wildcard permission for full access
         )
         try:
-            db_role = crud_role.create_role(db=db, role=admin_role)
+            db_role = await crud_role.create_role(db=db, role=admin_role)
             # Assign admin role to the user
             user_role = UserRoleCreate(
                 user_id=db_user.id,
                 role_id=db_role.id
             )
-            crud_role.assign_user_role(db=db, user_role=user_role)
+            await crud_role.assign_user_role(db=db, user_role=user_role)
             # Set user as superuser
-            db_user.is_superuser = True
-            db.commit()
+            db_user = await crud_user.update_user(db, user_id=db_user.id, user=UserUpdate(is_superuser=True))
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
@@ -80,41 +88,53 @@ async def create_user_internal(user: UserCreate, db: Session):
 
 @router.get("/", response_model=List[User])
 @has_permissions([PERMISSIONS['USER_READ']])
-async def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    users = crud_user.get_users(db, skip=skip, limit=limit)
-    return users
+async def read_users(after: Optional[str] = None, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_read_session), current_user: User = Depends(get_current_user)):
+    users = await crud_user.get_users(db, skip=skip, limit=limit, after=after, columns=USER_COLUMNS)
+    return json_rows_response(users, next_cursor_headers(USER_ORDER, users, limit))
 
 @router.get("/me", response_model=User)
 @has_permissions([PERMISSIONS['USER_READ']])
-async def read_current_user(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return current_user
+async def read_current_user(db: Session = Depends(get_read_session), current_user: User = Depends(get_current_user)):
+    return await load_current_user(current_user)
 
 @router.get("/{user_id}", response_model=User)
 @has_permissions([PERMISSIONS['USER_READ']])
-async def read_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_user = crud_user.get_user(db, user_id=user_id)
+async def read_user(user_id: int, db: Session = Depends(get_read_session), current_user: User = Depends(get_current_user)):
+    db_user = await crud_user.get_user(db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @router.put("/{user_id}", response_model=User)
 @has_permissions([PERMISSIONS['USER_UPDATE']])
-async def update_user(user_id: int, user: UserUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_user = crud_user.update_user(db, user_id=user_id, user=user)
+async def update_user(user_id: int, user: UserUpdate, db: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+    hashed_password = await get_password_hash_async(user.password) if user.password else None
+    db_user = await crud_user.update_user(db, user_id=user_id, user=user, hashed_password=hashed_password)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @router.delete("/{user_id}")
 @has_permissions([PERMISSIONS['USER_DELETE']])
-async def delete_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    success = crud_user.delete_user(db, user_id=user_id)
+async def delete_user(user_id: int, db: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+    success = await crud_user.delete_user(db, user_id=user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     return {"ok": True}
 
+@router.post("/{user_id}/revoke-tokens")
+@has_permissions([PERMISSIONS['USER_UPDATE']])
+async def revoke_user_tokens(user_id: int, db: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+    if current_user.id != user_id and not (await load_current_user(current_user)).is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    db_user = await crud_user.bump_security_version(db, user_id=user_id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"ok": True}
+
 @router.post("/register", response_model=Token)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_session)):
     # Create user using the create_user endpoint logic
     try:
         db_user = await create_user_internal(user, db)
@@ -128,33 +148,37 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 
     # Create tokens
     access_token = create_access_token(
-        data={"sub": db_user.username},
+        data=create_token_claims(db_user),
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    refresh_token = create_refresh_token(data={"sub": db_user.username})
+    refresh_token = create_refresh_token(data=create_token_claims(db_user))
 
     return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(UserModel).filter(UserModel.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_session)):
+    user = await crud_user.get_user_by_username(db, username=form_data.username)
+    verified, new_hash = await verify_password_async(form_data.password, user.hashed_password) if user else (False, None)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Transparently upgrade hashes made with a different bcrypt cost
+    if new_hash:
+        await crud_user.set_password_hash(db, user_id=user.id, hashed_password=new_hash)
 
     access_token = create_access_token(
-        data={"sub": user.username},
+        data=create_token_claims(user),
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    refresh_token = create_refresh_token(data={"sub": user.username})
+    refresh_token = create_refresh_token(data=create_token_claims(user))
 
     return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def refresh_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -165,18 +189,23 @@ async def refresh_token(token: str = Depends(oauth2_scheme), db: Session = Depen
                 detail="Invalid refresh token"
             )
         
-        user = db.query(UserModel).filter(UserModel.username == username).first()
+        user = await crud_user.get_user_by_username(db, username=username)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found"
             )
+        if "sv" in payload and payload["sv"] != user.security_version:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token"
+            )
 
         access_token = create_access_token(
-            data={"sub": username},
+            data=create_token_claims(user),
             expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         )
-        new_refresh_token = create_refresh_token(data={"sub": username})
+        new_refresh_token = create_refresh_token(data=create_token_claims(user))
 
         return {"access_token": access_token, "token_type": "bearer", "refresh_token": new_refresh_token}
 
@@ -191,10 +220,10 @@ async def refresh_token(token: str = Depends(oauth2_scheme), db: Session = Depen
 async def update_user_avatar(
     user_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    if current_user.id != user_id and not current_user.is_superuser:
+    if current_user.id != user_id and not (await load_current_user(current_user)).is_superuser:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
     # Validate file type
@@ -221,7 +250,7 @@ async def update_user_avatar(
 
     # Update user's avatar_url
     avatar_url = f"/storage/avatars/{filename}"
-    user = crud_user.update_user(db, user_id=user_id, user=UserUpdate(avatar_url=avatar_url))
+    user = await crud_user.update_user(db, user_id=user_id, user=UserUpdate(avatar_url=avatar_url))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -232,25 +261,27 @@ class PasswordUpdate(BaseModel):
 
 @router.put("/{user_id}/password")
 @has_permissions([PERMISSIONS['USER_UPDATE']])
-def update_password(
+async def update_password(
     user_id: int,
     password_update: PasswordUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     # Check permissions
-    if current_user.id != user_id and not current_user.is_superuser:
+    if current_user.id != user_id and not (await load_current_user(current_user)).is_superuser:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
     # Get user from database
-    db_user = crud_user.get_user(db, user_id=user_id)
+    db_user = await crud_user.get_user(db, user_id=user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Verify current password
-    if not verify_password(password_update.current_password, db_user.hashed_password):
+    verified, _ = await verify_password_async(password_update.current_password, db_user.hashed_password)
+    if not verified:
         raise HTTPException(status_code=400, detail="Incorrect password")
 
     # Update password
-    user = crud_user.update_user(db, user_id=user_id, user=UserUpdate(password=password_update.new_password))
+    hashed_password = await get_password_hash_async(password_update.new_password)
+    user = await crud_user.update_user(db, user_id=user_id, user=UserUpdate(), hashed_password=hashed_password)
     return {"message": "Password updated successfully"}
@@ -64,4 +64,9 @@ class ResourceEntry(ResourceEntryBase):
     updated_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ResourceEntrySearchResult(ResourceEntry):
+    rank: float
+    # Excerpt of the searchable fields, HTML-escaped, with matches in <mark>
+    snippet: Optional[str] = None
@@ -1,10 +1,22 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from datetime import datetime
 from typing import Optional, Dict, Any
 
 from enum import Enum
 from typing import Union, List
 
+from ..common.workflow import get_version_form_definitions
+
+def with_form_definitions(workflow_data: Optional[Dict[str, Any]], template_version_id: Optional[int]) -> Optional[Dict[str, Any]]:
+    """Fill in the forms of the ticket's template version from the version cache."""
+    metadata = (workflow_data or {}).get("metadata")
+    if metadata is None or metadata.get("form_definitions") is not None or not template_version_id:
+        return workflow_data
+    form_definitions = get_version_form_definitions(template_version_id)
+    if form_definitions is None:
+        return workflow_data
+    return {**workflow_data, "metadata": {**metadata, "form_definitions": form_definitions}}
+
 class TicketStatus(str, Enum):
     OPENED = "opened"
     IN_PROGRESS = "in_progress"
@@ -31,13 +43,29 @@ class StepData(BaseModel):
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     form_data: Dict[str, Any] = {}
+    # Accepted on writes and moved to ticket_events; never stored or returned
     history: List[HistoryEntry] = []
 
+class TicketEvent(BaseModel):
+    id: int
+    ticket_id: int
+    step_id: Optional[str] = None
+    type: str
+    from_status: Optional[str] = None
+    to_status: Optional[str] = None
+    user_id: Optional[int] = None
+    content: Optional[str] = None
+    timestamp: datetime
+
+    class Config:
+        from_attributes = True
+
 class WorkflowMetadata(BaseModel):
     template_version: str
     created_at: datetime
     workflow_config: Dict[str, Any]
-    form_definitions: Dict[str, List[Dict[str, Any]]]
+    form_definitions: Optional[Dict[str, List[Dict[str, Any]]]] = None
+    template_version_id: Optional[int] = None
 
 class WorkflowData(BaseModel):
     metadata: WorkflowMetadata
@@ -61,6 +89,41 @@ class TicketUpdate(BaseModel):
     priority: Optional[str] = None
     workflow_data: Optional[Dict[str, Dict[str, Any]]] = None
 
+class TicketBulkCreate(BaseModel):
+    tickets: List[TicketCreate]
+
+class TicketBulkUpdate(BaseModel):
+    ids: List[int]
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    # Applies to each ticket's in-progress steps; send null to unassign
+    assignee_id: Optional[int] = None
+
+class TicketBulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class TicketBulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[TicketBulkItemResult]
+
+class StepComplete(BaseModel):
+    form_data: Dict[str, Any] = {}
+
+class TicketFilter(BaseModel):
+    status: Optional[List[str]] = None
+    priority: Optional[List[str]] = None
+    template_id: Optional[List[int]] = None
+    created_by: Optional[List[int]] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    updated_after: Optional[datetime] = None
+    updated_before: Optional[datetime] = None
+    # Also search tickets moved to tickets_archive
+    include_archived: bool = False
+
 class Ticket(TicketBase):
     id: int
     description: Optional[str] = ""
@@ -68,9 +131,35 @@ class Ticket(TicketBase):
     priority: str
     template_id: int
     workflow_data: Optional[Dict[str, Dict[str, Any]]] = None
+    template_version_id: Optional[int] = None
+    version: int = 1
     created_by: int
     created_at: datetime
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+    @model_validator(mode="after")
+    def add_form_definitions(self):
+        workflow_data = with_form_definitions(self.workflow_data, self.template_version_id)
+        if workflow_data is not self.workflow_data:
+            self.workflow_data = workflow_data
+        return self
+
+class TicketSearchResult(Ticket):
+    rank: float
+    # Excerpt of the title, description or form data, HTML-escaped, with matches in <mark>
+    snippet: Optional[str] = None
+
+class TicketTask(BaseModel):
+    ticket_id: int
+    step_id: str
+    status: str
+    assignee_id: Optional[int] = None
+    role: Optional[str] = None
+    started_at: Optional[datetime] = None
+    ticket: Ticket
+
+    class Config:
+        from_attributes = True
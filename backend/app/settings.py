@@ -10,12 +10,86 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # Database settings
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+# Serve requests through an AsyncSession (aiosqlite for SQLite, asyncpg for Postgres)
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "False").lower() == "true"
+# Defaults to DATABASE_URL with the driver swapped for its async counterpart
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Read replica settings: read-only routes use DATABASE_READ_URL when set. Clients
+# that wrote recently keep reading from the primary for READ_YOUR_WRITES_SECONDS.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+ASYNC_DATABASE_READ_URL = os.getenv("ASYNC_DATABASE_READ_URL")
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# SQLite production mode: WAL, connection pragmas and separate writer/read-only pools
+SQLITE_TUNED = os.getenv("SQLITE_TUNED", "False").lower() == "true"
+# Sync sessions hold their connection across awaits inside a handler, so a single
+# writer connection is only the default when sessions are async
+SQLITE_WRITE_POOL_SIZE = int(os.getenv("SQLITE_WRITE_POOL_SIZE", "1" if DATABASE_ASYNC else "5"))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+SQLITE_POOL_TIMEOUT_SECONDS = float(os.getenv("SQLITE_POOL_TIMEOUT_SECONDS", "30"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+# Group commit: coalesce concurrent small writes into one transaction
+WRITE_COALESCING = os.getenv("WRITE_COALESCING", "False").lower() == "true"
+WRITE_COALESCE_WINDOW_MS = float(os.getenv("WRITE_COALESCE_WINDOW_MS", "5"))
+WRITE_COALESCE_MAX_BATCH = int(os.getenv("WRITE_COALESCE_MAX_BATCH", "100"))
 
 # JWT settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")  # Change this in production
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", str(7 * 24 * 60)))
 
+# Seconds a user's compiled permissions and role names are reused before they
+# are reloaded (role changes made through this process invalidate them immediately)
+PERMISSION_CACHE_TTL_SECONDS = int(os.getenv("PERMISSION_CACHE_TTL_SECONDS", "30"))
+
+# Stateless auth settings: resolve the current user from token claims instead of
+# loading the user row on every request
+AUTH_STATELESS_TOKENS = os.getenv("AUTH_STATELESS_TOKENS", "False").lower() == "true"
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_SECURITY_VERSION_TTL_SECONDS = int(os.getenv("AUTH_SECURITY_VERSION_TTL_SECONDS", "30"))
+
+# Password hashing settings: bcrypt runs in a bounded worker pool off the event loop
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", "5"))
+
+# Maximum number of tickets accepted by one bulk create or bulk update request
+TICKET_BULK_MAX = int(os.getenv("TICKET_BULK_MAX", "1000"))
+
+# Seconds a compiled ticket template is reused by create_ticket before it is
+# reloaded (edits made through this process invalidate it immediately)
+TEMPLATE_CACHE_TTL_SECONDS = int(os.getenv("TEMPLATE_CACHE_TTL_SECONDS", "60"))
+
+# Workflow step auto-assignment: "least_open_work" or "round_robin"
+ASSIGNMENT_STRATEGY = os.getenv("ASSIGNMENT_STRATEGY", "least_open_work").lower()
+ASSIGNMENT_RESEED_SECONDS = int(os.getenv("ASSIGNMENT_RESEED_SECONDS", "300"))
+
+# Serialized responses kept for templates, resource types and roles. Writes made
+# through this process drop them at once; the TTL bounds staleness for writes
+# made by other processes
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+
+# Completed and closed tickets unchanged for ARCHIVE_AFTER_DAYS are moved to
+# tickets_archive by a background job every ARCHIVE_INTERVAL_SECONDS (0 days
+# disables the job; "python -m app.manage archive-tickets" still works)
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+# Compression of large JSON columns (ticket workflow data, resource entry data,
+# template workflows): "" (off), "zlib" or "zstd". Values smaller than
+# JSON_COMPRESSION_MIN_BYTES are stored uncompressed; a level of 0 uses the
+# codec's default. Run "python -m app.manage compress-json-columns" after changing it
+JSON_COMPRESSION = os.getenv("JSON_COMPRESSION", "").lower()
+JSON_COMPRESSION_LEVEL = int(os.getenv("JSON_COMPRESSION_LEVEL", "0"))
+JSON_COMPRESSION_MIN_BYTES = int(os.getenv("JSON_COMPRESSION_MIN_BYTES", "128"))
+
 # File and log storage settings
 STORAGE_DIR = Path(os.getenv("STORAGE_DIR", str(BASE_DIR / "app/storage")))
 AVATAR_UPLOAD_DIR = Path(os.getenv("AVATAR_UPLOAD_DIR", str(STORAGE_DIR / "avatars")))
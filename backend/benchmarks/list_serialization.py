@@ -0,0 +1,111 @@
+"""Compare the ORM + response_model path with the Core row + orjson path for
+ticket lists. Run from the backend directory:
+
+    python -m benchmarks.list_serialization --rows 5000
+
+Uses a throwaway SQLite database, never the one configured in .env.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'benchmark.db')}"
+os.environ["DATABASE_ASYNC"] = "false"
+os.environ.pop("DATABASE_READ_URL", None)
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+from app.models.ticket import Ticket as TicketModel
+from app.schemas.ticket import Ticket
+from app.crud.ticket import get_tickets, TICKET_ORDER
+from app.common.fieldsets import parse_fields
+from app.common.fast_json import _json_array
+
+def seed(rows: int) -> None:
+    now = datetime.utcnow()
+    steps = {
+        f"step{i}": {
+            "status": "completed",
+            "assignee_id": 1,
+            "started_at": now.isoformat(),
+            "completed_at": now.isoformat(),
+            "form_data": {f"field{j}": f"value {j}" * 4 for j in range(8)},
+            "history": [{"timestamp": now.isoformat(), "type": "status_change", "from": "pending", "to": "in_progress"}] * 3
+        }
+        for i in range(5)
+    }
+    workflow_data = {
+        "metadata": {"template_version": "1", "created_at": now.isoformat(), "workflow_config": {"parallel_execution": False}},
+        "steps": steps
+    }
+    with SessionLocal() as db:
+        db.execute(insert(TicketModel), [
+            {
+                "title": f"Ticket {i}",
+                "description": "Benchmark ticket " * 5,
+                "status": "opened",
+                "priority": "medium",
+                "created_at": now - timedelta(seconds=i),
+                "updated_at": now,
+                "created_by": 1,
+                "template_id": 1,
+                "workflow_data": workflow_data,
+                "version": 1
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+
+def orm_path(rows: int) -> bytes:
+    # What a route returning ORM objects with response_model=List[Ticket] does
+    with SessionLocal() as db:
+        tickets = get_tickets(db, limit=rows)
+        adapter = TypeAdapter(list[Ticket])
+        content = adapter.dump_python(adapter.validate_python(tickets, from_attributes=True), mode="json")
+        return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode()
+
+async def _collect(rows) -> bytes:
+    return b"".join([chunk async for chunk in _json_array(rows)])
+
+def fast_path(rows: int, columns) -> bytes:
+    import asyncio
+    with SessionLocal() as db:
+        tickets = get_tickets(db, limit=rows, columns=columns)
+    return asyncio.run(_collect(tickets))
+
+def best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    full = parse_fields("*", TicketModel, Ticket, required=[column.key for column, _ in TICKET_ORDER])
+    light = parse_fields(None, TicketModel, Ticket, ("workflow_data",), required=[column.key for column, _ in TICKET_ORDER])
+    if json.loads(orm_path(args.rows)) != json.loads(fast_path(args.rows, full)):
+        raise SystemExit("Fast path output differs from the response_model output")
+
+    baseline = best_of(args.repeat, orm_path, args.rows)
+    print(f"{args.rows} tickets, best of {args.repeat}")
+    print(f"  ORM + response_model:        {baseline * 1000:8.1f} ms")
+    for label, columns in (("Core rows + orjson", full), ("Core rows + orjson, default", light)):
+        timing = best_of(args.repeat, fast_path, args.rows, columns)
+        print(f"  {label + ':':<28} {timing * 1000:8.1f} ms  ({baseline / timing:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -52,7 +52,7 @@ export function FormFieldRenderer({
 
     useEffect(() => {
         if ((field.type === 'resource' || field.type === 'resource_multi') && field.resource_type_id) {
-            resourceEntryApi.getByTypeId(field.resource_type_id).then(resources => {
+            resourceEntryApi.getByTypeId(field.resource_type_id, '*').then(resources => {
                 setResourceOptions(resources);
             }).catch(error => {
                 console.error('Failed to fetch resources:', error);
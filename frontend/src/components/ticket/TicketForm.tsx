@@ -24,7 +24,7 @@ export function TicketForm({ onSubmit, onCancel }: TicketFormProps) {
   useEffect(() => {
     const fetchTemplates = async () => {
       try {
-        const data = await templateApi.getAll();
+        const data = await templateApi.getAll('*');
         setTemplates(data);
         setLoading(false);
       } catch (err) {
@@ -60,11 +60,7 @@ export function TicketForm({ onSubmit, onCancel }: TicketFormProps) {
         metadata: {
           template_version: "1.0.0",
           created_at: new Date().toISOString(),
-          workflow_config: selectedTemplate.workflow_config,
-          form_definitions: selectedTemplate.workflow.reduce((acc, step) => ({
-            ...acc,
-            [step.id]: step.form
-          }), {})
+          workflow_config: selectedTemplate.workflow_config
         },
         steps: selectedTemplate.workflow.reduce((acc, step) => ({
           ...acc,
@@ -37,6 +37,12 @@ export interface ResourceEntry {
   updated_at?: string;
 }
 
+export interface ResourceEntrySearchResult extends ResourceEntry {
+  rank: number;
+  // HTML-escaped excerpt with the matched words wrapped in <mark>
+  snippet: string | null;
+}
+
 export interface ResourceTypeCreate extends Omit<ResourceType, 'id' | 'created_at' | 'updated_at'> {}
 
 export interface ResourceTypeUpdate extends Partial<ResourceTypeCreate> {}
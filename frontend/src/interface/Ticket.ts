@@ -7,6 +7,8 @@ export interface Ticket {
     priority: string;
     status: string;
     template_id: number;
+    template_version_id?: number | null;
+    version: number;
     created_by: number;
     created_at: string;
     updated_at: string;
@@ -20,6 +22,7 @@ export interface Ticket {
                 notification_rules: NotificationRule[];
             };
             form_definitions: Record<string, FormField[]>;
+            template_version_id?: number;
         };
         steps: {
             [key: string]: {
@@ -28,7 +31,7 @@ export interface Ticket {
                 started_at: string | null;
                 completed_at: string | null;
                 form_data: Record<string, any>;
-                history: Array<{
+                history?: Array<{
                     timestamp: string;
                     type: string;
                     from: string;
@@ -39,6 +42,12 @@ export interface Ticket {
     };
 }
 
+export interface TicketSearchResult extends Ticket {
+    rank: number;
+    // HTML-escaped excerpt with the matched words in <mark>
+    snippet: string | null;
+}
+
 export interface TicketCreate {
     title: string;
     description: string;
@@ -54,4 +63,43 @@ export interface TicketUpdate {
     priority?: string;
     status?: string;
     workflow_data?: Record<string, any>;
-}
\ No newline at end of file
+}
+
+export interface TicketQuery {
+    status?: string[];
+    priority?: string[];
+    template_id?: number[];
+    created_by?: number[];
+    created_after?: string;
+    created_before?: string;
+    updated_after?: string;
+    updated_before?: string;
+    sort?: string;
+    after?: string;
+    limit?: number;
+    // Comma-separated fields or '*'; workflow_data is only returned when requested
+    fields?: string;
+    // Also list tickets moved to the archive
+    include_archived?: boolean;
+}
+
+export type TicketSearchQuery = Omit<TicketQuery, 'sort'> & { q: string };
+
+export interface TicketEvent {
+    id: number;
+    ticket_id: number;
+    step_id: string | null;
+    type: string;
+    from_status: string | null;
+    to_status: string | null;
+    user_id: number | null;
+    content: string | null;
+    timestamp: string;
+}
+
+export interface JsonPatchOperation {
+    op: 'add' | 'remove' | 'replace' | 'move' | 'copy' | 'test';
+    path: string;
+    value?: any;
+    from?: string;
+}
@@ -2,9 +2,9 @@ import axios from 'axios';
 import { TicketTemplate, TicketTemplateCreate, TicketTemplateUpdate } from '@/interface/TicketTemplate';
 import { User, UserRole, UserCreate, UserUpdate } from '@/interface/User';
 import { Role } from '@/interface/Role';
-import { Ticket, TicketCreate, TicketUpdate } from '@/interface/Ticket';
+import { Ticket, TicketCreate, TicketUpdate, TicketQuery, TicketEvent, TicketSearchQuery, TicketSearchResult, JsonPatchOperation } from '@/interface/Ticket';
 import { useAuth } from '@/hooks/useAuth';
-import { ResourceType, ResourceTypeCreate, ResourceTypeUpdate, ResourceEntry, ResourceEntryCreate, ResourceEntryUpdate } from '@/interface/Resource';
+import { ResourceType, ResourceTypeCreate, ResourceTypeUpdate, ResourceEntry, ResourceEntryCreate, ResourceEntryUpdate, ResourceEntrySearchResult } from '@/interface/Resource';
 export const API_BASE_URL = 'http://localhost:8000';
 
 export const api = axios.create({
@@ -115,8 +115,9 @@ export const templateApi = {
     await api.delete(`/ticket-templates/${id}`);
   },
 
-  getAll: async (): Promise<TicketTemplate[]> => {
-    const response = await api.get('/ticket-templates');
+  // fields: comma-separated fields or '*'; workflow is only returned when requested
+  getAll: async (fields?: string): Promise<TicketTemplate[]> => {
+    const response = await api.get('/ticket-templates', { params: { fields } });
     return response.data;
   },
 
@@ -138,12 +139,26 @@ export const ticketApi = {
     return response.data;
   },
 
+  // Applies a JSON Patch; with a version, fails with 412 if the ticket changed since
+  patch: async (id: number, operations: JsonPatchOperation[], version?: number): Promise<Ticket> => {
+    const headers: Record<string, string> = { 'Content-Type': 'application/json-patch+json' };
+    if (version !== undefined) {
+      headers['If-Match'] = `"${id}-${version}"`;
+    }
+    const response = await api.patch(`/tickets/${id}`, operations, { headers });
+    return response.data;
+  },
+
   delete: async (id: number): Promise<void> => {
     await api.delete(`/tickets/${id}`);
   },
 
-  getAll: async (): Promise<Ticket[]> => {
-    const response = await api.get('/tickets');
+  getAll: async (params?: TicketQuery): Promise<Ticket[]> => {
+    const response = await api.get('/tickets', {
+      params,
+      // Repeat list params (status=a&status=b) the way FastAPI expects
+      paramsSerializer: { indexes: null },
+    });
     return response.data;
   },
 
@@ -151,6 +166,25 @@ export const ticketApi = {
     const response = await api.get(`/tickets/${id}`);
     return response.data;
   },
+
+  // Full-text search over title, description and form data, best match first
+  search: async (params: TicketSearchQuery): Promise<TicketSearchResult[]> => {
+    const response = await api.get('/tickets/search', {
+      params,
+      paramsSerializer: { indexes: null },
+    });
+    return response.data;
+  },
+
+  completeStep: async (id: number, stepId: string, formData: Record<string, any>): Promise<Ticket> => {
+    const response = await api.post(`/tickets/${id}/steps/${stepId}/complete`, { form_data: formData });
+    return response.data;
+  },
+
+  getHistory: async (id: number, params?: { step_id?: string; after?: string; limit?: number }): Promise<TicketEvent[]> => {
+    const response = await api.get(`/tickets/${id}/history`, { params });
+    return response.data;
+  },
 };
 
 // File API endpoints
@@ -222,8 +256,13 @@ export const resourceEntryApi = {
     await api.delete(`/resources/entries/${id}`);
   },
 
-  getByTypeId: async (resourceTypeId?: number): Promise<ResourceEntry[]> => {
-    const response = await api.get(`/resources/types/${resourceTypeId}/entries`);
+  // fields: comma-separated fields or '*'; data is only returned when requested.
+  // filters: 'field:op:value' on filterable fields, e.g. 'status:in:active|pending'
+  getByTypeId: async (resourceTypeId?: number, fields?: string, filters?: string[]): Promise<ResourceEntry[]> => {
+    const response = await api.get(`/resources/types/${resourceTypeId}/entries`, {
+      params: { fields, filter: filters },
+      paramsSerializer: { indexes: null },
+    });
     return response.data;
   },
 
@@ -231,4 +270,10 @@ export const resourceEntryApi = {
     const response = await api.get(`/resources/entries/${id}`);
     return response.data;
   },
+
+  // Full-text search over the type's searchable fields, best match first
+  search: async (resourceTypeId: number, q: string, params?: { after?: string; limit?: number }): Promise<ResourceEntrySearchResult[]> => {
+    const response = await api.get(`/resources/types/${resourceTypeId}/search`, { params: { q, ...params } });
+    return response.data;
+  },
 };
\ No newline at end of file
@@ -29,7 +29,7 @@ export default function Insights() {
     const fetchData = async () => {
       try {
         const [ticketsData, usersData] = await Promise.all([
-          ticketApi.getAll(),
+          ticketApi.getAll({ fields: '*' }),
           userApi.getAll()
         ]);
         setTickets(ticketsData);
@@ -37,7 +37,7 @@ export default function Insights() {
 
         // Fetch all resource types and their entries
         const resourceTypes = await resourceTypeApi.getAll();
-        const resourceEntriesPromises = resourceTypes.map(type => resourceEntryApi.getByTypeId(type.id));
+        const resourceEntriesPromises = resourceTypes.map(type => resourceEntryApi.getByTypeId(type.id, '*'));
         const resourceEntriesArrays = await Promise.all(resourceEntriesPromises);
         const allResourceEntries = resourceEntriesArrays.flat();
         setResources(allResourceEntries);
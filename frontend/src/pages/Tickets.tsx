@@ -57,6 +57,7 @@ export default function TicketsPage() {
 
   const totalPages = Math.ceil(filteredTickets.length / itemsPerPage);
   const isOpenedTickets = location.pathname === '/tickets/opened';
+  const ticketStatuses = isOpenedTickets ? ['opened'] : ['completed', 'closed', 'deleted'];
 
   useEffect(() => {
     const fetchUsers = async () => {
@@ -74,8 +75,8 @@ export default function TicketsPage() {
 
   const fetchTickets = async () => {
     try {
-      const ticketsData = await ticketApi.getAll();
-      setTickets(ticketsData.filter((ticket) => isOpenedTickets ? ticket.status === 'opened' : ['completed', 'closed', 'deleted'].includes(ticket.status)));
+      const ticketsData = await ticketApi.getAll({ status: ticketStatuses, fields: '*' });
+      setTickets(ticketsData);
     } catch (err) {
       console.error('Error fetching tickets:', err);
     }
@@ -85,10 +86,10 @@ export default function TicketsPage() {
     const fetchData = async () => {
       try {
         const [ticketsData, templatesData] = await Promise.all([
-          ticketApi.getAll(),
-          templateApi.getAll()
+          ticketApi.getAll({ status: ticketStatuses, fields: '*' }),
+          templateApi.getAll('*')
         ]);
-        setTickets(ticketsData.filter((ticket) => isOpenedTickets ? ticket.status === 'opened' : ['completed', 'closed', 'deleted'].includes(ticket.status)));
+        setTickets(ticketsData);
         setTemplates(templatesData);
       } catch (err) {
         console.error('Error fetching data:', err);
@@ -207,6 +208,15 @@ export default function TicketsPage() {
             .findIndex(step => step.id === selectedStep)}
           onSubmit={async (formData) => {
             try {
+              if (!formData.isDraft) {
+                // The server validates the form and starts the steps this one unblocks
+                const stepFormData = { ...formData };
+                delete stepFormData.isDraft;
+                await ticketApi.completeStep(selectedTicket.id!, selectedStep, stepFormData);
+                await fetchTickets();
+                setStepFormOpen(false);
+                return;
+              }
               const now = new Date().toISOString();
               const updatedSteps = {
                 ...selectedTicket.workflow_data.steps,
@@ -215,8 +225,8 @@ export default function TicketsPage() {
                   form_data: formData,
                   status: formData.isDraft ? 'in_progress' : 'completed',
                   completed_at: formData.isDraft ? null : now,
+                  // New entries are appended to the ticket's event log
                   history: [
-                    ...(selectedTicket.workflow_data.steps[selectedStep]?.history || []),
                     {
                       timestamp: now,
                       type: 'status_change',
@@ -267,30 +277,27 @@ export default function TicketsPage() {
               onClick={async () => {
                 if (!ticketToAssign) return;
                 try {
-                  const updatedTicket = await ticketApi.update(ticketToAssign.ticket.id!, {
-                    workflow_data: {
-                      ...ticketToAssign.ticket.workflow_data,
-                      steps: {
-                        ...ticketToAssign.ticket.workflow_data.steps,
-                        [ticketToAssign.stepId]: {
-                          ...ticketToAssign.ticket.workflow_data.steps[ticketToAssign.stepId],
-                          assignee_id: user?.id,
-                          status: 'in_progress',
-                          started_at: new Date().toISOString(),
-                          history: [
-                            ...(ticketToAssign.ticket.workflow_data.steps[ticketToAssign.stepId]?.history || []),
-                            {
-                              timestamp: new Date().toISOString(),
-                              type: 'status_change',
-                              from: 'pending',
-                              to: 'in_progress',
-                              user_id: user?.id
-                            }
-                          ]
+                  const { ticket, stepId } = ticketToAssign;
+                  const stepPath = `/workflow_data/steps/${stepId.replace(/~/g, '~0').replace(/\//g, '~1')}`;
+                  const now = new Date().toISOString();
+                  const updatedTicket = await ticketApi.patch(ticket.id!, [
+                    { op: 'replace', path: `${stepPath}/assignee_id`, value: user?.id },
+                    { op: 'replace', path: `${stepPath}/status`, value: 'in_progress' },
+                    { op: 'add', path: `${stepPath}/started_at`, value: now },
+                    {
+                      op: 'add',
+                      path: `${stepPath}/history`,
+                      value: [
+                        {
+                          timestamp: now,
+                          type: 'status_change',
+                          from: 'pending',
+                          to: 'in_progress',
+                          user_id: user?.id
                         }
-                      }
+                      ]
                     }
-                  });
+                  ], ticket.version);
                   setTickets(tickets.map(t => t.id === updatedTicket.id ? updatedTicket : t));
                   setAssignDialogOpen(false);
                   setTicketToAssign(null);
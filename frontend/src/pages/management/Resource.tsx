@@ -35,7 +35,7 @@ export default function ResourceManagement() {
       try {
         const [types, entries] = await Promise.all([
           resourceTypeApi.getAll(),
-          selectedResourceType && selectedResourceType.id ? resourceEntryApi.getByTypeId(selectedResourceType.id) : Promise.resolve([])
+          selectedResourceType && selectedResourceType.id ? resourceEntryApi.getByTypeId(selectedResourceType.id, '*') : Promise.resolve([])
         ]);
         setResourceTypes(types);
         setResourceEntries(entries);
@@ -368,7 +368,7 @@ export default function ResourceManagement() {
                         resource_type_id: selectedResourceType.id,
                         data
                       });
-                      const entries = await resourceEntryApi.getByTypeId(selectedResourceType.id);
+                      const entries = await resourceEntryApi.getByTypeId(selectedResourceType.id, '*');
                       setResourceEntries(entries);
                       setFilteredEntries(entries);
                       setCreateEntryDialogOpen(false);
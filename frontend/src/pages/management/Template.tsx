@@ -28,7 +28,7 @@ export default function TicketTemplateManagement() {
     const fetchTemplates = async () => {
       await fetchUserPermissions();
       try {
-        const data = await templateApi.getAll();
+        const data = await templateApi.getAll('*');
         setTemplates(data.map(template => ({ ...template, workflow: template.workflow || [] })));
       } catch (error) {
         console.error('Failed to fetch templates:', error);